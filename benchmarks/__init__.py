@@ -0,0 +1,6 @@
+"""
+Benchmarks of the importers on synthetic statements.
+
+Run `python -m benchmarks --help` from the repository root. Statements are
+generated offline by benchmarks.generators, so no real bills are needed.
+"""
@@ -0,0 +1,166 @@
+"""
+Benchmark the importers on synthetic statements.
+
+usage: python -m benchmarks [--tree legacy|beangulp] [--rows N ...]
+                            [--format NAME ...] [--repeat K] [-o RESULTS]
+
+Every case runs in fresh interpreters, so that import time, caches and the
+peak RSS are measured from a cold start. Results are written as JSON with
+sorted keys, ready to be compared with `python -m benchmarks.compare`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks.generators import FORMATS, generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ["identify", "extract", "e2e"]
+
+
+def package_version():
+    from importlib import metadata
+
+    try:
+        return metadata.version("china_bean_importers")
+    except metadata.PackageNotFoundError:
+        pass
+    # running from a checkout that is not installed
+    try:
+        with open(os.path.join(ROOT, "pyproject.toml")) as f:
+            if m := re.search(r'^version = "(.*)"', f.read(), re.MULTILINE):
+                return m[1]
+    except OSError:
+        pass
+    return None
+
+
+def run_worker(tree, mode, fmt, path, directory):
+    out = os.path.join(directory, f"{fmt.name}.{mode}.json")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [ROOT, os.environ.get("PYTHONPATH")])
+    )
+    command = ["-m", "benchmarks.worker", tree, mode, fmt.importer, path, out]
+    proc = subprocess.run(
+        [sys.executable] + command,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if not os.path.exists(out):
+        lines = proc.stderr.strip().splitlines() or [f"exit status {proc.returncode}"]
+        return {"error": lines[-1]}
+    with open(out) as f:
+        result = json.load(f)
+    os.remove(out)
+    return result
+
+
+def best_of(runs: list[dict]) -> dict:
+    """Fastest time and largest peak RSS over repeated runs."""
+    merged = dict(runs[0])
+    for run in runs[1:]:
+        for key, value in run.items():
+            if key.endswith("_s"):
+                merged[key] = min(merged[key], value)
+            elif key == "peak_rss_mb" and value is not None:
+                merged[key] = max(merged[key], value)
+    return merged
+
+
+def bench_case(tree, fmt, rows, seed, repeat, directory) -> dict:
+    result = {"format": fmt.name, "importer": fmt.importer, "rows": rows}
+    try:
+        path = generate(fmt, directory, rows, seed)
+    except Exception as e:
+        result["error"] = f"generate: {type(e).__name__}: {e}"
+        return result
+    result["file_bytes"] = os.path.getsize(path)
+
+    for mode in ["stages", "e2e"]:
+        runs = [run_worker(tree, mode, fmt, path, directory) for _ in range(repeat)]
+        if "error" in runs[0]:
+            result["error"] = f"{mode}: {runs[0]['error']}"
+            return result
+        merged = best_of(runs)
+        rss = merged.pop("peak_rss_mb")
+        result["peak_rss_mb" if mode == "stages" else "e2e_peak_rss_mb"] = rss
+        result.update(merged)
+
+    for stage in STAGES:
+        seconds = result[f"{stage}_s"]
+        result[f"{stage}_rows_per_s"] = rows / seconds if seconds else None
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tree", choices=["legacy", "beangulp"], default="legacy")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000])
+    parser.add_argument(
+        "--format",
+        nargs="+",
+        choices=[fmt.name for fmt in FORMATS],
+        help="formats to run (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", metavar="DIR", help="keep generated files in DIR")
+    parser.add_argument("-o", "--output", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    formats = [fmt for fmt in FORMATS if not args.format or fmt.name in args.format]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            directory = os.path.join(args.keep or tmp, str(rows))
+            os.makedirs(directory, exist_ok=True)
+            for fmt in formats:
+                result = bench_case(
+                    args.tree, fmt, rows, args.seed, args.repeat, directory
+                )
+                results.append(result)
+                print(summary(result), file=sys.stderr)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "tree": args.tree,
+            "version": package_version(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def summary(result) -> str:
+    head = f"{result['format']:<20} {result['rows']:>8}"
+    if "error" in result:
+        return f"{head}  ERROR {result['error']}"
+    rates = "  ".join(
+        f"{stage} {result[f'{stage}_rows_per_s'] or 0:>10.0f} rows/s"
+        for stage in STAGES
+    )
+    return f"{head}  {rates}  peak {result['peak_rss_mb'] or 0:.1f} MiB"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare two benchmark result files.
+
+usage: python -m benchmarks.compare OLD NEW
+
+Prints the change of throughput and peak RSS for every case found in both
+files. Ratios above 1 mean NEW is faster, or uses more memory.
+"""
+
+import json
+import sys
+
+METRICS = [
+    "identify_rows_per_s",
+    "extract_rows_per_s",
+    "e2e_rows_per_s",
+    "peak_rss_mb",
+]
+
+
+def load(path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {(r["format"], r["rows"]): r for r in report["results"]}
+
+
+def ratio(old, new):
+    if not old or new is None:
+        return None
+    return new / old
+
+
+def main(argv=None):
+    old_path, new_path = (argv or sys.argv)[1:3]
+    old, new = load(old_path), load(new_path)
+    print(f"{'format':<20} {'rows':>8}  " + "  ".join(f"{m:>20}" for m in METRICS))
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        cells = []
+        for metric in METRICS:
+            if "error" in after:
+                cells.append("error")
+            elif "error" in before:
+                cells.append("fixed")
+            else:
+                r = ratio(before.get(metric), after.get(metric))
+                cells.append("-" if r is None else f"{r:.2f}x")
+        print(f"{key[0]:<20} {key[1]:>8}  " + "  ".join(f"{c:>20}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+from china_bean_importers.common import BillDetailMapping as BDM, SAME_AS_NARRATION
+
+from benchmarks.generators import MERCHANTS
+
+CATEGORIES = {
+    "餐饮美食": "Food",
+    "交通出行": "Travel",
+    "日用百货": "Shopping",
+    "运动户外": "Sports",
+    "充值缴费": "Bills",
+    "文化休闲": "Entertainment",
+}
+
+# a few hundred mappings, about the size of a long-lived personal config
+EXTRA_MAPPINGS = [
+    BDM([f"商户{i}"], SAME_AS_NARRATION, f"Expenses:Misc:M{i}", [], {}, i % 3)
+    for i in range(300)
+]
+
+config = {
+    "importers": {
+        "alipay": {
+            "account": "Assets:Alipay",
+            "huabei_account": "Liabilities:Alipay:HuaBei",
+            "douyin_monthly_payment_account": "Liabilities:DouyinMonthlyPayment",
+            "yuebao_account": "Assets:Alipay:YuEBao",
+            "red_packet_income_account": "Income:Alipay:RedPacket",
+            "red_packet_expense_account": "Expenses:Alipay:RedPacket",
+            "category_mapping": {"交通出行": "Expenses:Travel"},
+        },
+        "wechat": {
+            "account": "Assets:WeChat",
+            "lingqiantong_account": "Assets:WeChat:LingQianTong",
+            "red_packet_income_account": "Income:WeChat:RedPacket",
+            "red_packet_expense_account": "Expenses:WeChat:RedPacket",
+            "family_card_expense_account": "Expenses:WeChat:FamilyCard",
+            "group_payment_expense_account": "Expenses:WeChat:Group",
+            "group_payment_income_account": "Income:WeChat:Group",
+            "transfer_expense_account": "Expenses:WeChat:Transfer",
+            "transfer_income_account": "Income:WeChat:Transfer",
+        },
+        "thu_ecard": {"account": "Assets:Card:THU"},
+        "hsbc_hk": {
+            "account_mapping": {"One": "Assets:Bank:HSBC"},
+            "use_cnh": False,
+        },
+        "boc": {"credit": {"extract_repayment_rate": False, "repayment_tag": None}},
+        "card_narration_whitelist": ["财付通(银联云闪付)"],
+        "card_narration_blacklist": ["支付宝", "财付通", "美团支付"],
+    },
+    "card_accounts": {
+        "Liabilities:Card": {"BoC": ["1234"], "CMBC": ["5678"]},
+        "Assets:Card": {"BoC": ["4321"], "CMB": ["3333"], "CMBC": ["4444"]},
+    },
+    "pdf_passwords": ["123456"],
+    "unknown_expense_account": "Expenses:Unknown",
+    "unknown_income_account": "Income:Unknown",
+    "detail_mappings": [
+        BDM(
+            [name],
+            SAME_AS_NARRATION,
+            f"Expenses:{CATEGORIES[category]}",
+            [],
+            {"merchant": name},
+        )
+        for name, category in MERCHANTS
+    ]
+    + [
+        BDM(["滴滴"], ["滴滴出行"], "Expenses:Travel:Taxi", [], {}, 1, "AND"),
+        BDM([], ["万龙运动旅游"], None, ["ski"], {}),
+    ]
+    + EXTRA_MAPPINGS,
+}
@@ -0,0 +1,698 @@
+"""
+Synthetic statements in the formats understood by the importers.
+
+Every generator has the signature write(path, rows, rng) and writes a file
+holding `rows` transactions, drawn from `rng` so that the same seed always
+produces the same file. The files only need to be realistic enough to go
+through identify() and extract() the way real statements do.
+"""
+
+import csv
+import io
+import os
+import random
+from datetime import date, datetime, timedelta
+from typing import Callable, NamedTuple
+
+START = datetime(2023, 1, 1)
+DAYS = 365
+REAL_NAME = "张三"
+
+# merchant, category as printed by the payment apps
+MERCHANTS = [
+    ("美团", "餐饮美食"),
+    ("饿了么", "餐饮美食"),
+    ("肯德基", "餐饮美食"),
+    ("瑞幸咖啡", "餐饮美食"),
+    ("滴滴出行", "交通出行"),
+    ("北京地铁", "交通出行"),
+    ("中国铁路12306", "交通出行"),
+    ("京东", "日用百货"),
+    ("拼多多", "日用百货"),
+    ("盒马鲜生", "日用百货"),
+    ("万龙运动旅游", "运动户外"),
+    ("中国移动", "充值缴费"),
+    ("国家电网", "充值缴费"),
+    ("腾讯视频", "文化休闲"),
+    ("哔哩哔哩", "文化休闲"),
+]
+CANTEENS = ["紫荆园", "桃李园", "清芬园", "观畴园", "听涛园"]
+
+
+class Format(NamedTuple):
+    name: str
+    # module name, the same in china_bean_importers and its beangulp package
+    importer: str
+    filename: str
+    write: Callable[[str, int, random.Random], None]
+
+
+def timeline(rows: int, rng: random.Random) -> list[datetime]:
+    """Sorted transaction times spread over a year."""
+    span = DAYS * 86400
+    return sorted(
+        START + timedelta(seconds=rng.randrange(span)) for _ in range(rows)
+    )
+
+
+def price(rng: random.Random) -> str:
+    return f"{rng.lognormvariate(3, 1) + 1:.2f}"
+
+
+def write_text(path: str, lines, encoding="utf-8"):
+    with open(path, "w", encoding=encoding, newline="") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+
+
+def csv_line(row) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator="").writerow(row)
+    return out.getvalue()
+
+
+def wechat_rows(rows: int, rng: random.Random):
+    times = timeline(rows, rng)
+    yield ["微信支付账单明细"] + [""] * 8
+    yield ["微信昵称：[bench]"] + [""] * 8
+    yield [
+        f"起始时间：[{START:%Y-%m-%d %H:%M:%S}] "
+        f"终止时间：[{START + timedelta(days=DAYS):%Y-%m-%d %H:%M:%S}]"
+    ] + [""] * 8
+    yield [f"导出时间：[{START + timedelta(days=DAYS):%Y-%m-%d %H:%M:%S}]"] + [""] * 8
+    yield []
+    yield ["----------------------微信支付账单明细列表--------------------"] + [""] * 8
+    yield [
+        "交易时间",
+        "交易类型",
+        "交易对方",
+        "商品",
+        "收/支",
+        "金额(元)",
+        "支付方式",
+        "当前状态",
+        "交易单号",
+        "商户单号",
+        "备注",
+    ]
+    for i, time in enumerate(reversed(times)):
+        merchant, _ = rng.choice(MERCHANTS)
+        roll = rng.random()
+        if roll < 0.05:
+            kind, payee, goods, direction, method = "微信红包", "李四", "/", "收入", "/"
+            status = "已存入零钱"
+        elif roll < 0.1:
+            kind, payee, goods, direction = "转账", "王五", "/", "支出"
+            method, status = "零钱", "对方已收钱"
+        else:
+            kind, payee, goods, direction = "商户消费", merchant, f"{merchant}订单", "支出"
+            method = rng.choice(["零钱", "中国银行(1234)", "招商银行(3333)"])
+            status = "支付成功"
+        yield [
+            f"{time:%Y-%m-%d %H:%M:%S}",
+            kind,
+            payee,
+            goods,
+            direction,
+            f"¥{price(rng)}",
+            method,
+            status,
+            f"4200{i:024d}\t",
+            f"{i:020d}\t",
+            "/",
+        ]
+
+
+def write_wechat_csv(path: str, rows: int, rng: random.Random):
+    write_text(path, map(csv_line, wechat_rows(rows, rng)))
+
+
+def write_wechat_xlsx(path: str, rows: int, rng: random.Random):
+    import openpyxl
+
+    book = openpyxl.Workbook(write_only=True)
+    sheet = book.create_sheet()
+    for row in wechat_rows(rows, rng):
+        sheet.append(row or [None])
+    book.save(path)
+
+
+def write_alipay_mobile(path: str, rows: int, rng: random.Random):
+    times = timeline(rows, rng)
+    lines = [
+        "-" * 24 + "支付宝（中国）网络技术有限公司  电子客户回单" + "-" * 24,
+        f"起始时间：[{START:%Y-%m-%d %H:%M:%S}]    "
+        f"终止时间：[{START + timedelta(days=DAYS):%Y-%m-%d %H:%M:%S}]",
+        "交易时间,交易分类,交易对方,对方账号,商品说明,收/支,金额,收/付款方式,"
+        "交易状态,交易订单号,商家订单号,备注,",
+    ]
+    for i, time in enumerate(reversed(times)):
+        merchant, category = rng.choice(MERCHANTS)
+        method = rng.choice(["花呗", "余额", "余额宝", "中国银行储蓄卡(4321)"])
+        lines.append(
+            csv_line(
+                [
+                    f"{time:%Y-%m-%d %H:%M:%S}",
+                    category,
+                    merchant,
+                    f"{merchant}@alipay.com",
+                    f"{merchant}商品",
+                    "支出",
+                    price(rng),
+                    method,
+                    "交易成功",
+                    f"2023{i:024d}",
+                    f"M{i:012d}",
+                    "",
+                    "",
+                ]
+            )
+        )
+    lines.append("-" * 84)
+    write_text(path, lines, "gbk")
+
+
+def write_alipay_web(path: str, rows: int, rng: random.Random):
+    times = timeline(rows, rng)
+    end = START + timedelta(days=DAYS)
+    lines = [
+        "支付宝交易记录明细查询",
+        "账号:[zhangsan@example.com]",
+        f"起始日期:[{START:%Y-%m-%d %H:%M:%S}]    终止日期:[{end:%Y-%m-%d %H:%M:%S}]",
+        "-" * 33 + "交易记录明细列表" + "-" * 36,
+        "交易号                  ,商家订单号               ,交易创建时间              ,"
+        "付款时间                ,最近修改时间              ,交易来源地     ,"
+        "类型              ,交易对方            ,商品名称                ,"
+        "金额（元）   ,收/支     ,交易状态    ,服务费（元）   ,成功退款（元）  ,"
+        "备注                  ,资金状态     ,",
+    ]
+    for i, time in enumerate(reversed(times)):
+        merchant, _ = rng.choice(MERCHANTS)
+        income = rng.random() < 0.1
+        lines.append(
+            csv_line(
+                [
+                    f"2023{i:024d}    ",
+                    f"M{i:012d}    ",
+                    f"{time:%Y-%m-%d %H:%M:%S} ",
+                    f"{time:%Y-%m-%d %H:%M:%S} ",
+                    f"{time:%Y-%m-%d %H:%M:%S} ",
+                    "其他（包括阿里巴巴和外部商家）",
+                    "即时到账交易          ",
+                    f"{merchant}          ",
+                    f"{merchant}商品          ",
+                    f"{price(rng)}  ",
+                    "收入      " if income else "支出      ",
+                    "交易成功    ",
+                    "0.00     ",
+                    "0.00     ",
+                    "                    ",
+                    "已收入      " if income else "已支出      ",
+                    "",
+                ]
+            )
+        )
+    lines += [
+        "-" * 84,
+        f"共{rows}笔记录",
+        f"导出时间:[{end:%Y-%m-%d %H:%M:%S}]    用户:{REAL_NAME}",
+    ]
+    write_text(path, lines, "gbk")
+
+
+def write_thu_ecard(path: str, rows: int, rng: random.Random):
+    header = (
+        "summary,posjourno,idserial,txaccno,inputuserid,pcode,poscode,accno,"
+        "txcode,cardno,txdate,txname,stationcode,identityno,sts,balance,journo,"
+        "regdate,departid,id,txamt,meraddr,username,mername"
+    )
+    lines = [header]
+    balance = 100000
+    # newest first, and the export ends with a line that is not a transaction
+    for i, time in enumerate(reversed(timeline(rows + 1, rng))):
+        if rng.random() < 0.05:
+            summary, name, fen = "充值", "领取圈存", 20000
+            balance -= fen
+        else:
+            summary, name, fen = "消费", "消费", rng.randrange(300, 3000)
+            balance += fen
+        canteen = rng.choice(CANTEENS)
+        lines.append(
+            csv_line(
+                [
+                    summary,
+                    f"{i + 1}",
+                    "2020000000",
+                    "1",
+                    "",
+                    "",
+                    f"{rng.randrange(1000, 2000)}",
+                    "1",
+                    "1",
+                    "100000",
+                    f"{time:%Y-%m-%d %H:%M:%S}",
+                    name,
+                    "",
+                    "",
+                    "1",
+                    f"{balance}",
+                    f"J{i}",
+                    f"{time:%Y-%m-%d %H:%M:%S}",
+                    "",
+                    f"{i}",
+                    f"{fen}",
+                    f"{canteen}一层",
+                    REAL_NAME,
+                    canteen,
+                ]
+            )
+        )
+    write_text(path, lines)
+
+
+def write_thu_ecard_old(path: str, rows: int, rng: random.Random):
+    lines = ["序号,交易地点,交易类型,终端编号,交易时间,交易金额"]
+    for i, time in enumerate(reversed(timeline(rows, rng))):
+        lines.append(
+            f"{i + 1},{rng.choice(CANTEENS)},消费,T{rng.randrange(10000):04d},"
+            f"{time:%Y-%m-%d %H:%M:%S},{rng.randrange(3, 30)}.50"
+        )
+    lines.append("合计,,,,,")
+    write_text(path, lines)
+
+
+def write_hsbc(path: str, rows: int, rng: random.Random):
+    lines = ["Date,Description,Billing amount,Billing currency,Balance"]
+    balance = 100000.0
+    for time in timeline(rows, rng):
+        merchant = rng.choice(["PARKNSHOP", "MTR", "7-ELEVEN", "OCTOPUS", "UBER"])
+        value = float(price(rng))
+        balance -= value
+        lines.append(
+            f"{time:%d/%m/%Y},{merchant} {rng.randrange(10000)} APPLEPAY,"
+            f"-{value:.2f},HKD,{balance:.2f}"
+        )
+    write_text(path, lines)
+
+
+def write_ccb(path: str, rows: int, rng: random.Random):
+    lines = [
+        "中国建设银行个人活期账户全部交易明细",
+        f"卡号/账号:6217000000000004321,起始日期:{START:%Y%m%d},"
+        f"结束日期:{START + timedelta(days=DAYS):%Y%m%d}",
+        "序号,摘要,币别,钞汇,交易日期,交易金额,账户余额,交易地点/附言,对方账号与户名",
+    ]
+    balance = 100000.0
+    for i, time in enumerate(timeline(rows, rng)):
+        merchant, _ = rng.choice(MERCHANTS)
+        value = float(price(rng))
+        balance -= value
+        lines.append(
+            f"{i + 1},消费,人民币元,,{time:%Y%m%d},-{value:.2f},{balance:.2f},"
+            f"{merchant},6222000000001111/{merchant}"
+        )
+    write_text(path, lines)
+
+
+def write_cmbc_csv(path: str, rows: int, rng: random.Random):
+    lines = ["交易日,记账日,卡号末四位,授权码,摘要,金额"]
+    for time in timeline(rows, rng):
+        merchant, _ = rng.choice(MERCHANTS)
+        lines.append(f"{time:%m%d},{time:%Y%m%d},5678,,消费-{merchant},{price(rng)}")
+    write_text(path, lines)
+
+
+def write_email(path: str, subject: str, html: str, charset="utf-8", nested=False):
+    from email.message import EmailMessage
+
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = "bill@example.com"
+    if nested:
+        # CMBC wraps a base64 body in multipart/related inside multipart/mixed
+        message.set_content(html, subtype="html", charset=charset, cte="base64")
+        message.make_related()
+        message.make_mixed()
+    else:
+        message.set_content(
+            html, subtype="html", charset=charset, cte="quoted-printable"
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(message.as_string())
+
+
+def write_boc_eml(path: str, rows: int, rng: random.Random):
+    bill_date = START + timedelta(days=DAYS)
+    cells = []
+    for time in timeline(rows, rng):
+        merchant, _ = rng.choice(MERCHANTS)
+        cells.append(
+            f"<tr><td>{time:%Y-%m-%d}</td><td>{time:%Y-%m-%d}</td><td>1234</td>"
+            f"<td>消费-{merchant}</td><td></td><td>{price(rng)}</td></tr>"
+        )
+    html = (
+        "<html><head><title>中国银行电子帐单</title></head><body>"
+        '<table class="bill_sum_detail_table"><tr>'
+        f"<td>{bill_date + timedelta(days=20):%Y-%m-%d}</td>"
+        f"<td>{bill_date:%Y-%m-%d}</td><td>100</td><td>0</td></tr></table>"
+        '<div class="bill_card_detail">'
+        '<div class="bill_card_des">(卡号：1234)人民币交易明细</div>'
+        "<table><tr><td>交易日</td><td>记账日</td><td>卡号</td><td>描述</td>"
+        f"<td>存入</td><td>支出</td></tr>{''.join(cells)}</table></div>"
+        "</body></html>"
+    )
+    write_email(path, "中国银行信用卡电子合并账单", html)
+
+
+def write_icbc_eml(path: str, rows: int, rng: random.Random):
+    cells = []
+    for time in timeline(rows, rng):
+        merchant, _ = rng.choice(MERCHANTS)
+        value = price(rng)
+        cells.append(
+            f"<tr><td>5678</td><td>{time:%Y-%m-%d}</td><td>消费</td>"
+            f"<td>{merchant}</td><td>{value}/RMB</td><td>{value}/RMB(支出)</td></tr>"
+        )
+    html = (
+        "<html><body><table><tr>"
+        f"<td>对账单生成日{START + timedelta(days=DAYS):%Y年%m月%d日}</td>"
+        "</tr></table><table><tr><td>卡号后四位</td><td>交易日</td><td>交易类型</td>"
+        "<td>商户名称/城市</td><td>交易金额/币种</td><td>记账金额/币种</td></tr>"
+        f"{''.join(cells)}</table></body></html>"
+    )
+    write_email(path, "中国工商银行客户对账单", html)
+
+
+def write_cmbc_eml(path: str, rows: int, rng: random.Random):
+    bill_date = date(2023, 12, 31)
+    cells = []
+    for time in timeline(rows, rng):
+        merchant, _ = rng.choice(MERCHANTS)
+        cells.append(
+            "".join(
+                f"<td><font>{text}</font></td>"
+                for text in [
+                    f"{time:%m/%d}",
+                    f"{time:%m/%d}",
+                    f"消费-{merchant}",
+                    price(rng),
+                    "5678",
+                ]
+            )
+        )
+    html = (
+        "<html><body><table><tr>"
+        '<td><span id="fixBand36">本期账单日</span></td>'
+        f"<td><font>{bill_date:%Y/%m/%d}</font></td></tr></table>"
+        '<span id="fixBand29"><font>人民币 RMB</font></span>'
+        '<span id="loopBand3"><table>'
+        f"{''.join(f'<tr>{row}</tr>' for row in cells)}</table></span>"
+        '<span id="fixBand29"><font>&nbsp;</font></span>'
+        "</body></html>"
+    )
+    write_email(path, "民生信用卡电子对账单", html, charset="gbk", nested=True)
+
+
+def draw_table(page, top, rows, widths, height=18, fontsize=6):
+    import fitz
+
+    x = 20
+    for c, width in enumerate(widths):
+        for r, row in enumerate(rows):
+            rect = fitz.Rect(x, top + r * height, x + width, top + (r + 1) * height)
+            page.draw_rect(rect, color=(0, 0, 0), width=0.5)
+            page.insert_text(
+                (rect.x0 + 2, rect.y0 + 12),
+                row[c],
+                fontname="china-s",
+                fontsize=fontsize,
+            )
+        x += width
+
+
+def write_table_pdf(path, header, data_rows, widths, title_lines, per_page=25):
+    import fitz
+
+    doc = fitz.open()
+    for start in range(0, max(len(data_rows), 1), per_page):
+        page = doc.new_page(width=842, height=595)
+        if start == 0:
+            for x, y, text in title_lines:
+                page.insert_text((x, y), text, fontname="china-s", fontsize=8)
+        draw_table(page, 60, [header] + data_rows[start : start + per_page], widths)
+    doc.save(path)
+
+
+def write_boc_debit(path: str, rows: int, rng: random.Random):
+    header = [
+        "记账日期",
+        "记账时间",
+        "币别",
+        "金额",
+        "余额",
+        "交易名称",
+        "渠道",
+        "网点名称",
+        "附言",
+        "对方账户名",
+        "对方卡号/账号",
+        "对方开户行",
+    ]
+    data_rows = []
+    balance = 100000.0
+    for time in timeline(rows, rng):
+        merchant, _ = rng.choice(MERCHANTS)
+        value = float(price(rng))
+        balance -= value
+        data_rows.append(
+            [
+                f"{time:%Y-%m-%d}",
+                f"{time:%H:%M:%S}",
+                "人民币",
+                f"-{value:.2f}",
+                f"{balance:.2f}",
+                "网上快捷支付",
+                "银联",
+                "------",
+                merchant,
+                f"{merchant}公司",
+                "------",
+                "------",
+            ]
+        )
+    title = [
+        (30, 30, "中国银行交易流水明细清单"),
+        (30, 45, f"交易区间：{START:%Y-%m-%d} 至 {START + timedelta(days=DAYS):%Y-%m-%d}"),
+        (300, 45, f"客户姓名：{REAL_NAME}"),
+        (500, 45, "6216000000000004321"),
+    ]
+    write_table_pdf(path, header, data_rows, [66] * 12, title)
+
+
+def write_icbc_debit(path: str, rows: int, rng: random.Random):
+    header = [
+        "交易日期",
+        "帐号",
+        "储种",
+        "序号",
+        "币种",
+        "钞汇",
+        "摘要",
+        "地区",
+        "收入/支出金额",
+        "余额",
+        "对方户名",
+        "对方帐号",
+        "渠道",
+    ]
+    data_rows = []
+    balance = 100000.0
+    for time in timeline(rows, rng):
+        merchant, _ = rng.choice(MERCHANTS)
+        value = float(price(rng))
+        balance -= value
+        data_rows.append(
+            [
+                f"{time:%Y-%m-%d%H:%M:%S}",
+                "0200000000000004321",
+                "活期",
+                "1",
+                "人民币",
+                "钞",
+                "消费",
+                "北京",
+                f"-{value:.2f}",
+                f"{balance:.2f}",
+                merchant,
+                "（空）",
+                "网上银行",
+            ]
+        )
+    title = [
+        (30, 30, "中国工商银行借记账户历史明细（电子版）"),
+        (30, 45, "卡号 6222000000000004321"),
+        (300, 45, f"户名：{REAL_NAME}"),
+        (
+            450,
+            45,
+            f"起止日期：{START:%Y-%m-%d} — {START + timedelta(days=DAYS):%Y-%m-%d}",
+        ),
+    ]
+    write_table_pdf(path, header, data_rows, [61] * 13, title)
+
+
+def write_word_pdf(path, title_lines, lines_per_page, rows, row_words, footer):
+    """Word layout statements: every row is a list of (x, text) at one y."""
+    import fitz
+
+    doc = fitz.open()
+    page = None
+    y = 0
+    for i in range(rows):
+        if page is None or y > lines_per_page:
+            if page is not None:
+                footer(page, doc.page_count)
+            page = doc.new_page(width=842, height=595)
+            y = 40
+            for x, text in title_lines(doc.page_count == 1):
+                page.insert_text((x, y), text, fontname="china-s", fontsize=8)
+                y += 14
+        for x, text in row_words(i):
+            page.insert_text((x, y), text, fontname="china-s", fontsize=6)
+        y += 12
+    if page is not None:
+        footer(page, doc.page_count)
+    doc.save(path)
+
+
+def write_cmb_debit(path: str, rows: int, rng: random.Random):
+    times = timeline(rows, rng)
+
+    def title_lines(first):
+        if first:
+            yield 30, "招商银行交易流水"
+            yield 30, f"户 名：{REAL_NAME}"
+            yield 30, "账号：6214000000003333"
+        yield 400, "Counter Party"
+
+    def row_words(i):
+        merchant, _ = rng.choice(MERCHANTS)
+        return [
+            (31, f"{times[i]:%Y-%m-%d}"),
+            (60, "CNY"),
+            (110, f"-{price(rng)}"),
+            (210, "1000.00"),
+            (290, "快捷支付"),
+            (400, merchant),
+        ]
+
+    def footer(page, number):
+        page.insert_text((400, 580), f"{number}/{number}", fontname="helv", fontsize=8)
+
+    write_word_pdf(path, title_lines, 560, rows, row_words, footer)
+
+
+def write_cmbc_debit(path: str, rows: int, rng: random.Random):
+    times = timeline(rows, rng)
+
+    def title_lines(first):
+        if first:
+            yield 30, "中国民生银行个人账户对账单"
+            yield 30, f"客户姓名:{REAL_NAME}"
+            yield 30, "客户账号:6226000000004444"
+            yield 30, (
+                f"起止日期:{START:%Y/%m/%d}-{START + timedelta(days=DAYS):%Y/%m/%d}"
+            )
+        yield 696, "对方行名"
+
+    def row_words(i):
+        merchant, _ = rng.choice(MERCHANTS)
+        return [
+            (98, f"{times[i]:%Y/%m/%d}"),
+            (140, f"{times[i]:%H:%M:%S}"),
+            (174, "消费"),
+            (336, f"-{price(rng)}"),
+            (414, "1000.00"),
+            (449, "转"),
+            (483, "网银"),
+            (534, "总行"),
+            (569, f"{merchant}/6222000000001111"),
+            (697, "民生银行"),
+        ]
+
+    def footer(page, number):
+        page.insert_text((30, 580), "_" * 20, fontname="helv", fontsize=8)
+
+    write_word_pdf(path, title_lines, 560, rows, row_words, footer)
+
+
+def write_boc_pdf(path: str, rows: int, rng: random.Random):
+    import fitz
+
+    bill_date = START + timedelta(days=DAYS)
+    doc = fitz.open()
+
+    def new_page(first):
+        page = doc.new_page(width=595, height=842)
+        if first:
+            page.insert_text((30, 40), "中国银行信用卡账单", fontname="china-s", fontsize=12)
+            page.insert_text(
+                (30, 70), "Current FCY Total Balance Due", fontname="helv", fontsize=8
+            )
+            page.insert_text(
+                (300, 110),
+                f"{bill_date + timedelta(days=20):%Y-%m-%d}\n{bill_date:%Y-%m-%d}"
+                "\n100.00\n0.00",
+                fontname="helv",
+                fontsize=8,
+            )
+            page.insert_text(
+                (30, 160), "(卡号：1234)人民币交易明细", fontname="china-s", fontsize=8
+            )
+            page.insert_text((520, 190), "Expenditure", fontname="helv", fontsize=8)
+        return page, 220
+
+    page, y = new_page(True)
+    for time in timeline(rows, rng):
+        if y > 780:
+            page, y = new_page(False)
+        merchant, _ = rng.choice(MERCHANTS)
+        page.insert_text(
+            (30, y),
+            f"{time:%Y-%m-%d}\n{time:%Y-%m-%d}\n1234",
+            fontname="helv",
+            fontsize=7,
+        )
+        page.insert_text((150, y), f"消费-{merchant}", fontname="china-s", fontsize=7)
+        page.insert_text((540, y), price(rng), fontname="helv", fontsize=7)
+        y += 32
+    page.insert_text((30, y + 20), "Loyalty Plan", fontname="helv", fontsize=8)
+    doc.save(path)
+
+
+FORMATS = [
+    Format("wechat_csv", "wechat", "微信支付账单.csv", write_wechat_csv),
+    Format("wechat_xlsx", "wechat", "微信支付账单.xlsx", write_wechat_xlsx),
+    Format("alipay_mobile_csv", "alipay_mobile", "alipay.csv", write_alipay_mobile),
+    Format("alipay_web_txt", "alipay_web", "alipay_record.txt", write_alipay_web),
+    Format("thu_ecard_csv", "thu_ecard", "thu_ecard.csv", write_thu_ecard),
+    Format("thu_ecard_old_csv", "thu_ecard_old", "thu_old.csv", write_thu_ecard_old),
+    Format("hsbc_hk_csv", "hsbc_hk", "One_hsbc.csv", write_hsbc),
+    Format("ccb_debit_csv", "ccb_debit_card", "ccb_detail.csv", write_ccb),
+    Format("cmbc_credit_csv", "cmbc_credit_card", "cmbc_credit.csv", write_cmbc_csv),
+    Format("boc_credit_pdf", "boc_credit_card", "中国银行信用卡账单.pdf", write_boc_pdf),
+    Format("boc_debit_pdf", "boc_debit_card", "boc_debit.pdf", write_boc_debit),
+    Format("cmb_debit_pdf", "cmb_debit_card", "cmb_debit.pdf", write_cmb_debit),
+    Format("icbc_debit_pdf", "icbc_debit_card", "icbc_debit.pdf", write_icbc_debit),
+    Format("cmbc_debit_pdf", "cmbc_debit_card", "cmbc_debit.pdf", write_cmbc_debit),
+    Format("boc_credit_eml", "boc_credit_card", "boc_credit.eml", write_boc_eml),
+    Format("icbc_credit_eml", "icbc_credit_card", "icbc_credit.eml", write_icbc_eml),
+    Format("cmbc_credit_eml", "cmbc_credit_card", "cmbc_credit.eml", write_cmbc_eml),
+]
+
+
+def generate(fmt: Format, directory: str, rows: int, seed: int = 0) -> str:
+    path = os.path.join(directory, fmt.filename)
+    fmt.write(path, rows, random.Random(f"{fmt.name}-{rows}-{seed}"))
+    return path
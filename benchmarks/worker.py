@@ -0,0 +1,102 @@
+"""
+Run a single benchmark case in a fresh interpreter.
+
+usage: python -m benchmarks.worker TREE MODE IMPORTER PATH RESULT
+
+MODE is "stages" (import, identify and extract with the given importer) or
+"e2e" (dispatch through an ImporterRegistry over every importer of TREE,
+then extract). Timings and the peak RSS are written to RESULT as JSON, so
+that anything the importers print cannot get mixed into them.
+"""
+
+import importlib
+import json
+import sys
+import time
+
+from benchmarks.generators import FORMATS
+
+
+def package(tree: str) -> str:
+    if tree == "legacy":
+        return "china_bean_importers"
+    return "china_bean_importers.beangulp"
+
+
+def peak_rss_mb():
+    # linux keeps ru_maxrss across exec(), so it would include the parent's
+    # peak; VmHWM belongs to this address space only
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / (1 << 10)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def run_stages(tree, name, path):
+    from benchmarks.config import config
+    from china_bean_importers.run import wrap_file
+
+    result = {}
+    start = time.perf_counter()
+    module = importlib.import_module(f"{package(tree)}.{name}")
+    result["import_s"] = time.perf_counter() - start
+
+    importer = module.Importer(config)
+    file = wrap_file(importer, path)
+    start = time.perf_counter()
+    identified = importer.identify(file)
+    result["identify_s"] = time.perf_counter() - start
+    if not identified:
+        raise ValueError(f"{name} did not identify {path}")
+
+    start = time.perf_counter()
+    entries = importer.extract(file, [])
+    result["extract_s"] = time.perf_counter() - start
+    result["entries"] = len(entries)
+    return result
+
+
+def run_e2e(tree, name, path):
+    from benchmarks.config import config
+    from china_bean_importers import run
+
+    names = sorted(set(fmt.importer for fmt in FORMATS))
+    modules = [importlib.import_module(f"{package(tree)}.{n}") for n in names]
+    importers = [module.Importer(config) for module in modules]
+
+    start = time.perf_counter()
+    run._init_worker(importers, [])
+    _, index, entries = run._extract_file(path)
+    elapsed = time.perf_counter() - start
+    if index is None or names[index] != name:
+        found = None if index is None else names[index]
+        raise ValueError(f"{path} was dispatched to {found} instead of {name}")
+    return {"e2e_s": elapsed, "entries": len(entries)}
+
+
+def main(argv=None):
+    tree, mode, name, path, out = (argv or sys.argv)[1:6]
+    try:
+        if mode == "stages":
+            result = run_stages(tree, name, path)
+        else:
+            result = run_e2e(tree, name, path)
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    result["peak_rss_mb"] = peak_rss_mb()
+    with open(out, "w") as f:
+        json.dump(result, f)
+
+
+if __name__ == "__main__":
+    main()
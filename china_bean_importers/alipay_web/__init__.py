@@ -1,97 +1,66 @@
-from dateutil.parser import parse
-from beancount.ingest import importer
-from beancount.core import data, amount
-from beancount.core.number import D
-import csv
-import re
+"""
+Alipay web exports (支付宝交易记录明细查询). The statement reader is shared with
+china_bean_importers.beangulp.alipay_web; the beancount.ingest Importer is
+loaded on first access (PEP 562), so that reading statements does not pull in
+beancount 2.
+"""
 
-from china_bean_importers.common import *
+import importlib
+import re
+import typing
+from datetime import datetime
 
+from china_bean_importers.cache import file_cache
+from china_bean_importers.common import parse_datetime
+from china_bean_importers.instrument import timed
 
-class Importer(importer.ImporterProtocol):
-    def __init__(self, config) -> None:
-        super().__init__()
-        self.config = config
+ALIPAY_WEB_START = re.compile(r"起始日期:\[([0-9 :-]+)\]")
+ALIPAY_WEB_END = re.compile(r"终止日期:\[([0-9 :-]+)\]")
 
-    def identify(self, file):
-        return "txt" in file.name and "支付宝交易记录明细查询" in file.head()
 
-    def file_account(self, file):
-        return "alipay_web"
+class AlipayWebStatement(typing.NamedTuple):
+    start: typing.Optional[datetime]
+    end: typing.Optional[datetime]
+    # (csv record number, cells) of each transaction, as read
+    rows: list
 
-    def file_date(self, file):
-        with open(file.name, "r", encoding="gbk") as f:
-            for row in csv.reader(f):
-                m = re.search(r"起始日期:\[([0-9 :-]+)\]", row[0])
-                if m:
-                    date = parse(m[1])
-                    return date
-        return super().file_date(file)
 
-    def file_name(self, file):
-        with open(file.name, "r", encoding="gbk") as f:
-            for row in csv.reader(f):
-                m = re.search(r"终止日期:\[([0-9 :-]+)\]", row[0])
-                if m:
-                    date = parse(m[1])
-                    return "to." + date.date().isoformat() + ".txt"
-        return super().file_name(file)
+@timed("decode")
+def read_alipay_web(name):
+    """
+    Period and transactions of an Alipay web export, read in a single pass
+    over its decoded text.
+    """
+    import csv
 
-    def extract(self, file, existing_entries=None):
-        entries = []
+    def load():
+        start = end = None
+        rows = []
         begin = False
-        with open(file.name, "r", encoding="gbk") as f:
+        with open(name, "r", encoding="gbk") as f:
             for lineno, row in enumerate(csv.reader(f)):
-                row = [col.strip() for col in row]
-                if row[0] == "交易号" and row[1] == "商家订单号":
+                if not row:
+                    continue
+                if begin:
+                    if row[0].strip().startswith("------"):
+                        break
+                    rows.append((lineno, tuple(row)))
+                elif [c.strip() for c in row[:2]] == ["交易号", "商家订单号"]:
                     begin = True
-                elif begin and row[0].startswith("------"):
-                    break
-                elif begin:
-                    metadata = data.new_metadata(file.name, lineno)
-                    date = parse(row[2]).date()
-                    units = amount.Amount(D(row[9]), "CNY")
-                    payee = row[7]
-                    narration = row[8]
+                else:
+                    # the period is printed above the table
+                    if start is None and (m := ALIPAY_WEB_START.search(row[0])):
+                        start = parse_datetime(m[1])
+                    if end is None and (m := ALIPAY_WEB_END.search(row[0])):
+                        end = parse_datetime(m[1])
+        return AlipayWebStatement(start, end, rows)
 
-                    account1 = "Assets:Alipay"
-                    account2 = find_destination_account(
-                        self.config, payee, narration, row[10] == "支出"
-                    )
+    return file_cache.get(name, "alipay-web", load)
 
-                    if row[10] == "支出":
-                        units1 = -units
-                    elif row[10] == "收入" or row[10] == "其他":
-                        units1 = units
-                    else:
-                        assert False
 
-                    txn = data.Transaction(
-                        meta=metadata,
-                        date=date,
-                        flag=self.FLAG,
-                        payee=payee,
-                        narration=narration,
-                        tags=data.EMPTY_SET,
-                        links=data.EMPTY_SET,
-                        postings=[
-                            data.Posting(
-                                account=account1,
-                                units=units1,
-                                cost=None,
-                                price=None,
-                                flag=None,
-                                meta=None,
-                            ),
-                            data.Posting(
-                                account=account2,
-                                units=None,
-                                cost=None,
-                                price=None,
-                                flag=None,
-                                meta=None,
-                            ),
-                        ],
-                    )
-                    entries.append(txn)
-        return entries
+def __getattr__(name):
+    if name == "Importer":
+        module = importlib.import_module(f"{__name__}.importer")
+        globals()[name] = module.Importer
+        return module.Importer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,90 @@
+from beancount.ingest import importer
+from beancount.core import data, amount
+from beancount.core.number import D
+
+from china_bean_importers.common import *
+from china_bean_importers.alipay_web import read_alipay_web
+
+
+class Importer(importer.ImporterProtocol):
+    def __init__(self, config) -> None:
+        super().__init__()
+        self.config = config
+        self.config_sections = list(SHARED_CONFIG)
+        self.extensions = [".txt"]
+        self.encodings = ["gbk"]
+        self.signature_keywords = ["支付宝交易记录明细查询"]
+
+    @timed("identify")
+    def identify(self, file):
+        return "txt" in file.name and "支付宝交易记录明细查询" in file.head()
+
+    def file_account(self, file):
+        return "alipay_web"
+
+    def file_date(self, file):
+        start = read_alipay_web(file.name).start
+        if start is not None:
+            return start
+        return super().file_date(file)
+
+    def file_name(self, file):
+        end = read_alipay_web(file.name).end
+        if end is not None:
+            return "to." + end.date().isoformat() + ".txt"
+        return super().file_name(file)
+
+    @timed("extract")
+    @cache_extract
+    def extract(self, file, existing_entries=None):
+        return list(self.iter_extract(file, existing_entries))
+
+    def iter_extract(self, file, existing_entries=None):
+        for lineno, row in read_alipay_web(file.name).rows:
+            row = [col.strip() for col in row]
+            metadata = data.new_metadata(file.name, lineno)
+            date = parse_datetime(row[2]).date()
+            units = amount.Amount(D(row[9]), "CNY")
+            payee = row[7]
+            narration = row[8]
+
+            account1 = "Assets:Alipay"
+            account2 = compiled_mappings(self.config).match(
+                narration, payee
+            )[0] or unknown_account(self.config, row[10] == "支出")
+
+            if row[10] == "支出":
+                units1 = -units
+            elif row[10] == "收入" or row[10] == "其他":
+                units1 = units
+            else:
+                assert False
+
+            txn = data.Transaction(
+                meta=metadata,
+                date=date,
+                flag=self.FLAG,
+                payee=payee,
+                narration=narration,
+                tags=data.EMPTY_SET,
+                links=data.EMPTY_SET,
+                postings=[
+                    data.Posting(
+                        account=account1,
+                        units=units1,
+                        cost=None,
+                        price=None,
+                        flag=None,
+                        meta=None,
+                    ),
+                    data.Posting(
+                        account=account2,
+                        units=None,
+                        cost=None,
+                        price=None,
+                        flag=None,
+                        meta=None,
+                    ),
+                ],
+            )
+            yield txn
@@ -0,0 +1,54 @@
+from collections import deque
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed list of keywords.
+
+    search() returns the indices of all keywords occurring in a text, with a
+    single pass over the text regardless of the number of keywords. A keyword
+    `k` is reported exactly when `k in text` holds, including the empty
+    keyword, which occurs in every text.
+    """
+
+    def __init__(self, keywords):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[tuple[int, ...]] = [()]
+
+        for i, keyword in enumerate(keywords):
+            state = 0
+            for ch in keyword:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                    self.goto[state][ch] = nxt
+                state = nxt
+            self.output[state] += (i,)
+
+        # breadth first, so that fail targets are complete before their users
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] += self.output[self.fail[nxt]]
+
+    def search(self, text: str) -> set[int]:
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set(output[0])
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
@@ -1,18 +1,9 @@
-from china_bean_importers.beangulp import (
-    alipay_mobile,
-    alipay_web,
-    boc_credit_card,
-    boc_debit_card,
-    ccb_debit_card,
-    cmb_debit_card,
-    cmbc_credit_card,
-    cmbc_debit_card,
-    icbc_credit_card,
-    icbc_debit_card,
-    hsbc_hk,
-    thu_ecard_old,
-    wechat,
-)
+"""
+Importer modules are loaded on first access (PEP 562), so importing the
+package itself stays cheap and does not pull in beancount.
+"""
+
+import importlib
 
 __all__ = [
     "alipay_mobile",
@@ -26,6 +17,19 @@ __all__ = [
     "icbc_credit_card",
     "icbc_debit_card",
     "hsbc_hk",
+    "thu_ecard",
     "thu_ecard_old",
     "wechat",
 ]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module(f"{__name__}.{name}")
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
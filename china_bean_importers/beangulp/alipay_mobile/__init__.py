@@ -1,31 +1,34 @@
-from dateutil.parser import parse
 from beancount.core import data
 from beancount.core.data import D
 import csv
 import re
 
 from china_bean_importers.common import *
+from china_bean_importers.dedup import serial_key
 from china_bean_importers.beangulp.importer import CsvImporter
 
 
 class Importer(CsvImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.config_sections.append(("importers", "alipay"))
         self.encoding = "gbk"
         self.match_keywords = ["支付宝", "电子客户回单"]
         self.file_account_name = "alipay_mobile"
 
     def parse_metadata(self, filepath: str):
         if m := re.search(r"起始时间：\[([0-9 :-]+)\]", self.full_content):
-            self.start = parse(m[1])
+            self.start = parse_datetime(m[1])
         if m := re.search(r"终止时间：\[([0-9 :-]+)\]", self.full_content):
-            self.end = parse(m[1])
+            self.end = parse_datetime(m[1])
 
-    def extract(self, filepath: str, existing=None):
-        entries = []
+    def dedup_key(self, entry):
+        return serial_key(entry)
+
+    def iter_extract(self, filepath: str, existing=None):
         begin = False
 
-        for lineno, row in enumerate(csv.reader(self.content)):
+        for lineno, row in enumerate(self.csv_rows(filepath)):
             row = [col.strip() for col in row]
             if len(row) <= 12:
                 continue
@@ -56,7 +59,7 @@ class Importer(CsvImporter):
                     status,
                     serial,
                 ) = row[:10]
-                time = parse(time)
+                time = parse_datetime(time)
                 units = data.Amount(D(amt), "CNY")
                 metadata["serial"] = serial
                 metadata["status"] = status
@@ -140,9 +143,9 @@ class Importer(CsvImporter):
                     elif "抖音月付" in narration:
                         account2 = source_config["douyin_monthly_payment_account"]
                 else:
-                    new_account, new_meta, new_tags = match_destination_and_metadata(
-                        self.config, narration, payee
-                    )
+                    new_account, new_meta, new_tags = compiled_mappings(
+                        self.config
+                    ).match(narration, payee)
                     if new_account:
                         account2 = new_account
                     metadata.update(new_meta)
@@ -193,6 +196,4 @@ class Importer(CsvImporter):
                         ),
                     ],
                 )
-                entries.append(txn)
-
-        return entries
+                yield txn
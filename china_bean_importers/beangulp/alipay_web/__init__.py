@@ -1,12 +1,10 @@
-from dateutil.parser import parse
 from beangulp import Importer
 from beancount.core import data
 from beancount.core.data import D
-import csv
-import re
 
 from china_bean_importers.common import *
-from china_bean_importers.beangulp.importer import FLAG
+from china_bean_importers.alipay_web import read_alipay_web
+from china_bean_importers.beangulp.importer import FLAG, remember_parse, with_parse
 
 
 class Importer(Importer):
@@ -15,86 +13,88 @@ class Importer(Importer):
     def __init__(self, config) -> None:
         super().__init__()
         self.config = config
+        self.config_sections = list(SHARED_CONFIG)
+        self.extensions = [".txt"]
+        self.encodings = ["gbk"]
+        self.signature_keywords = ["支付宝交易记录明细查询"]
 
+    @timed("identify")
+    @remember_parse
     def identify(self, filepath: str):
-        return "txt" in filepath and "支付宝交易记录明细查询" in open(filepath, "r", encoding="gbk").read(1024)
+        return "txt" in filepath and "支付宝交易记录明细查询" in read_head(
+            filepath, "gbk", 1024
+        )
 
+    @with_parse
     def account(self, filepath: str):
         return "alipay_web"
 
+    @with_parse
     def date(self, filepath: str):
-        with open(filepath, "r", encoding="gbk") as f:
-            for row in csv.reader(f):
-                m = re.search(r"起始日期:\[([0-9 :-]+)\]", row[0])
-                if m:
-                    date = parse(m[1])
-                    return date
+        start = read_alipay_web(filepath).start
+        if start is not None:
+            return start
         return super().date(filepath)
 
+    @with_parse
     def filename(self, filepath: str):
-        with open(filepath, "r", encoding="gbk") as f:
-            for row in csv.reader(f):
-                m = re.search(r"终止日期:\[([0-9 :-]+)\]", row[0])
-                if m:
-                    date = parse(m[1])
-                    return "to." + date.date().isoformat() + ".txt"
+        end = read_alipay_web(filepath).end
+        if end is not None:
+            return "to." + end.date().isoformat() + ".txt"
         return super().filename(filepath)
 
+    @timed("extract")
+    @with_parse
+    @cache_extract
     def extract(self, filepath: str, existing=None):
-        entries = []
-        begin = False
-        with open(filepath, "r", encoding="gbk") as f:
-            for lineno, row in enumerate(csv.reader(f)):
-                row = [col.strip() for col in row]
-                if row[0] == "交易号" and row[1] == "商家订单号":
-                    begin = True
-                elif begin and row[0].startswith("------"):
-                    break
-                elif begin:
-                    metadata = data.new_metadata(filepath, lineno)
-                    date = parse(row[2]).date()
-                    units = data.Amount(D(row[9]), "CNY")
-                    payee = row[7]
-                    narration = row[8]
+        return list(self.iter_extract(filepath, existing))
 
-                    account1 = "Assets:Alipay"
-                    account2 = find_destination_account(
-                        self.config, payee, narration, row[10] == "支出"
-                    )
+    def iter_extract(self, filepath: str, existing=None):
+        for lineno, row in read_alipay_web(filepath).rows:
+            row = [col.strip() for col in row]
+            metadata = data.new_metadata(filepath, lineno)
+            date = parse_datetime(row[2]).date()
+            units = data.Amount(D(row[9]), "CNY")
+            payee = row[7]
+            narration = row[8]
 
-                    if row[10] == "支出":
-                        units1 = -units
-                    elif row[10] == "收入" or row[10] == "其他":
-                        units1 = units
-                    else:
-                        assert False
+            account1 = "Assets:Alipay"
+            account2 = compiled_mappings(self.config).match(
+                narration, payee
+            )[0] or unknown_account(self.config, row[10] == "支出")
 
-                    txn = data.Transaction(
-                        meta=metadata,
-                        date=date,
-                        flag=self.FLAG,
-                        payee=payee,
-                        narration=narration,
-                        tags=data.EMPTY_SET,
-                        links=data.EMPTY_SET,
-                        postings=[
-                            data.Posting(
-                                account=account1,
-                                units=units1,
-                                cost=None,
-                                price=None,
-                                flag=None,
-                                meta=None,
-                            ),
-                            data.Posting(
-                                account=account2,
-                                units=None,
-                                cost=None,
-                                price=None,
-                                flag=None,
-                                meta=None,
-                            ),
-                        ],
-                    )
-                    entries.append(txn)
-        return entries
+            if row[10] == "支出":
+                units1 = -units
+            elif row[10] == "收入" or row[10] == "其他":
+                units1 = units
+            else:
+                assert False
+
+            txn = data.Transaction(
+                meta=metadata,
+                date=date,
+                flag=self.FLAG,
+                payee=payee,
+                narration=narration,
+                tags=data.EMPTY_SET,
+                links=data.EMPTY_SET,
+                postings=[
+                    data.Posting(
+                        account=account1,
+                        units=units1,
+                        cost=None,
+                        price=None,
+                        flag=None,
+                        meta=None,
+                    ),
+                    data.Posting(
+                        account=account2,
+                        units=None,
+                        cost=None,
+                        price=None,
+                        flag=None,
+                        meta=None,
+                    ),
+                ],
+            )
+            yield txn
@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beangulp import Importer
 from beancount.core import data
 from beancount.core.data import D
@@ -7,7 +6,8 @@ import re
 import sys
 
 from china_bean_importers.common import *
-from china_bean_importers.beangulp.importer import FLAG
+from china_bean_importers.beangulp.dedup import mark_duplicates
+from china_bean_importers.beangulp.importer import FLAG, remember_parse, with_parse
 
 
 class Importer(Importer):
@@ -16,7 +16,14 @@ class Importer(Importer):
     def __init__(self, config) -> None:
         super().__init__()
         self.config = config
+        self.config_sections = list(SHARED_CONFIG) + [("importers", "boc")]
+        card_accounts(config)
+        self.dedup_by_amount = True
         self.rate = None
+        self.extensions = [".pdf", ".eml"]
+
+    def __getstate__(self):
+        return importer_state(self)
 
     def get_config(self, cfg, account, narration):
         if "importers" not in self.config:
@@ -38,42 +45,44 @@ class Importer(Importer):
     def extract_repayment_rate(self, account, narration) -> bool:
         return self.get_config("extract_repayment_rate", account, narration)
 
+    @timed("identify")
+    @remember_parse
     def identify(self, filepath: str):
         if filepath.upper().endswith(".PDF"):
             self.type = "pdf"
 
-            import fitz
-            if "中国银行信用卡" in filepath:
-                self.doc = fitz.open(filepath)
+            if "中国银行" not in filepath:
+                return False
+            doc = open_pdf(self.config, filepath)
+            if doc is None:
+                return False
+            if "中国银行信用卡" in filepath or "信用卡账单" in doc[0].get_text():
+                self.doc = doc
                 return True
-            elif "中国银行" in filepath:
-                doc = fitz.open(filepath)
-                if "信用卡账单" in doc[0].get_text():
-                    self.doc = doc
-                    return True
             return False
         elif filepath.upper().endswith(".EML"):
             self.type = "email"
             from bs4 import BeautifulSoup
-            import email
-            from email import policy
             import quopri
 
-            try:
-                raw_email = email.message_from_file(
-                    open(filepath), policy=policy.default
-                )
+            def load():
+                raw_email = read_email(filepath)
                 raw_body_html = quopri.decodestring(
                     raw_email.get_body().get_payload()
                 ).decode()
-                self.body = BeautifulSoup(raw_body_html, features="lxml")
+                return BeautifulSoup(raw_body_html, features="lxml")
+
+            try:
+                self.body = file_cache.get(filepath, "boc_credit_card.body", load)
                 return self.body.title.text == "中国银行电子帐单"
             except BaseException:
                 return False
 
+    @with_parse
     def account(self, filepath: str):
         return "boc_credit_card"
 
+    @with_parse
     def date(self, filepath: str):
         if self.type == "pdf":
             begin = False
@@ -86,18 +95,19 @@ class Importer(Importer):
                 elif begin:
                     parts = content.split("\n")
                     if len(parts) == 4:
-                        return parse(parts[1])
+                        return parse_datetime(parts[1])
                     elif len(parts) == 3 or len(parts) == 2:
-                        return parse(parts[0])
+                        return parse_datetime(parts[0])
                     else:
                         break
         elif self.type == "email":
             info_table = self.body.select("table.bill_sum_detail_table")[0]
             # 到期还款日 账单日 本期人民币欠款总计 本期外币欠款总计
             bill_date = info_table.find_all("td")[1].text
-            return parse(bill_date)
+            return parse_datetime(bill_date)
         return super().date(filepath)
 
+    @timed("extract_text_entries")
     def extract_text_entries(self):
         card_num_regex = re.compile(r".*\(卡号(:|：)(\d+)\)")
         currency_regex = re.compile(r".*(\(([a-zA-Z]+)\))(\w+)?交易明细.*", flags=re.DOTALL)
@@ -240,6 +250,13 @@ class Importer(Importer):
 
         return text_entries
 
+    def deduplicate(self, entries, existing) -> None:
+        if rest := mark_duplicates(self, entries, existing):
+            super().deduplicate(rest, existing)
+
+    @timed("extract")
+    @with_parse
+    @cache_extract
     def extract(self, filepath: str, existing=None):
 
         # generate beancount posting entries
@@ -294,11 +311,11 @@ class Importer(Importer):
                 units = -units
 
             if trans_date != "":
-                date = parse(trans_date)
+                date = parse_datetime(trans_date)
                 if post_date != "":
                     metadata["post_date"] = post_date
             else:
-                date = parse(post_date)
+                date = parse_datetime(post_date)
                 # transaction date is empty
 
             if in_blacklist(self.config, orig_narration):
@@ -308,8 +325,8 @@ class Importer(Importer):
                 )
                 continue
 
-            if m := match_destination_and_metadata(
-                self.config, orig_narration, payee
+            if m := compiled_mappings(self.config).match(
+                orig_narration, payee
             ):  # match twice with narration
                 (account2, new_meta, new_tags) = m
                 metadata.update(new_meta)
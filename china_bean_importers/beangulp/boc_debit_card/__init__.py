@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.core import data
 from beancount.core.data import D
 import re
@@ -18,7 +17,7 @@ def gen_txn(config, filepath, parts, lineno, flag, card_acc, real_name):
     # parts[8]: 附言
     narration = parts[5] if "------" in parts[8] else parts[8]
     # parts[0]: 记账日期
-    date = parse(parts[0]).date()
+    date = parse_datetime(parts[0]).date()
     # parts[2]: 币别
     currency_code = match_currency_code(parts[2])
     my_assert(
@@ -58,7 +57,7 @@ def gen_txn(config, filepath, parts, lineno, flag, card_acc, real_name):
 
     tags = set()
 
-    if m := match_destination_and_metadata(config, narration, payee):
+    if m := compiled_mappings(config).match(narration, payee):
         (account2, new_meta, new_tags) = m
         metadata.update(new_meta)
         tags = tags.union(new_tags)
@@ -110,6 +109,7 @@ def gen_txn(config, filepath, parts, lineno, flag, card_acc, real_name):
 class Importer(PdfTableImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.dedup_by_amount = True
         self.match_keywords = ["中国银行交易流水明细清单"]
         self.file_account_name = "boc_debit_card"
         self.header_first_cell = "记账日期"
@@ -120,8 +120,8 @@ class Importer(PdfTableImporter):
             self.full_content,
         )
         assert match
-        self.start = parse(match[1])
-        self.end = parse(match[2])
+        self.start = parse_datetime(match[1])
+        self.end = parse_datetime(match[2])
 
         match = re.search(r"客户姓名：\s*(\w+)", self.full_content)
         assert match
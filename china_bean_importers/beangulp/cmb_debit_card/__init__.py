@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.core import data
 from beancount.core.data import D
 import re
@@ -26,7 +25,7 @@ def gen_txn(config, filepath, parts, lineno, flag, card_acc, real_name):
         # parts[4]: 交易摘要
         narration = parts[4]
     # parts[0]: 记账日期
-    date = parse(parts[0]).date()
+    date = parse_datetime(parts[0]).date()
     # parts[2]: 金额
     units1 = data.Amount(D(parts[2]), "CNY")
     # parts[3]: 余额
@@ -42,7 +41,7 @@ def gen_txn(config, filepath, parts, lineno, flag, card_acc, real_name):
     if payee_account:
         metadata["payee_account"] = payee_account
 
-    if m := match_destination_and_metadata(config, narration, payee):
+    if m := compiled_mappings(config).match(narration, payee):
         (account2, new_meta, new_tags) = m
         metadata.update(new_meta)
         tags = tags.union(new_tags)
@@ -91,6 +90,7 @@ class Importer(PdfImporter):
         import re
 
         super().__init__(config)
+        self.dedup_by_amount = True
         self.match_keywords = ["招商银行交易流水"]
         self.file_account_name = "cmbc_debit_card"
         self.column_offsets = [30, 50, 100, 200, 280, 350, 400]
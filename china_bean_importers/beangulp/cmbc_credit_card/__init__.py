@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beangulp import Importer
 from beancount.core import data
 from beancount.core.data import D
@@ -6,7 +5,8 @@ import csv
 import re
 
 from china_bean_importers.common import *
-from china_bean_importers.beangulp.importer import FLAG
+from china_bean_importers.beangulp.dedup import mark_duplicates
+from china_bean_importers.beangulp.importer import FLAG, remember_parse, with_parse
 
 FOREIGN_CURR_TX = re.compile(
     r"^(?P<desc>.*?)\s*?(?P<country>[A-Z]+)(?P<amount>[-\d.]+)\s*(?P<currency>[A-Z]+)$"
@@ -19,37 +19,42 @@ class Importer(Importer):
     def __init__(self, config) -> None:
         super().__init__()
         self.config = config
+        self.config_sections = list(SHARED_CONFIG)
+        card_accounts(config)
+        self.dedup_by_amount = True
         self.match_keywords = ["卡号末四位", "交易日"]
+        self.extensions = [".csv", ".eml"]
 
+    def __getstate__(self):
+        return importer_state(self)
+
+    @timed("identify")
+    @remember_parse
     def identify(self, filepath: str):
         if filepath.upper().endswith(".CSV"):
             self.type = "csv"
             try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    self.full_content = f.read()
-                    self.content = []
-                    for ln in self.full_content.splitlines():
-                        if (l := ln.strip()) != "":
-                            self.content.append(l)
-                    if "csv" in filepath and all(
-                        map(lambda c: c in self.full_content, self.match_keywords)
-                    ):
-                        return True
+                # look at the header first to avoid decoding unrelated files
+                head = read_head(filepath, "utf-8")
+                if not all(map(lambda c: c in head, self.match_keywords)):
+                    return False
+                self.full_content = read_text(filepath, "utf-8")
+                self.content = read_lines(filepath, "utf-8")
+                if "csv" in filepath and all(
+                    map(lambda c: c in self.full_content, self.match_keywords)
+                ):
+                    return True
                 return False
             except:
                 return False
         elif filepath.upper().endswith(".EML"):
             self.type = "email"
             from bs4 import BeautifulSoup
-            import email
-            from email import policy
-            import quopri, base64
+            import base64
             from html import unescape
 
             try:
-                raw_email = email.message_from_file(
-                    open(filepath), policy=policy.default
-                )
+                raw_email = read_email(filepath)
                 # weird encapsulation
                 raw_body_html = unescape(
                     base64.b64decode(
@@ -63,22 +68,31 @@ class Importer(Importer):
                 stmtDateCell = self.body.select("span#fixBand36")[
                     0
                 ].parent.nextSibling.font.text
-                self.stmt_date = parse(stmtDateCell)
+                self.stmt_date = parse_datetime(stmtDateCell)
                 return "民生信用卡" in raw_email["Subject"]
             except BaseException:
                 return False
 
+    @with_parse
     def account(self, filepath: str):
         return "cmbc_credit_card"
 
+    @with_parse
     def date(self, filepath: str):
         if self.type == "csv":
             if len(self.content) > 1:
-                return parse(self.content[1].split(",")[1])
+                return parse_datetime(self.content[1].split(",")[1])
         elif self.type == "email":
             return self.stmt_date
         return super().date(filepath)
 
+    def deduplicate(self, entries, existing) -> None:
+        if rest := mark_duplicates(self, entries, existing):
+            super().deduplicate(rest, existing)
+
+    @timed("extract")
+    @with_parse
+    @cache_extract
     def extract(self, filepath: str, existing=None):
 
         # generate beancount posting entries
@@ -93,6 +107,7 @@ class Importer(Importer):
         )
         return tx
 
+    @timed("extract_text_entries")
     def extract_text_entries(self):
         """
         extract entries in format of `generate_tx` from csv / eml
@@ -160,6 +175,7 @@ class Importer(Importer):
 
         return entries
 
+    @timed("generate_tx")
     def generate_tx(self, row: list, lineno: int, file):
         #   0      1        2       3    4    5
         # 交易日, 记账日, 卡号末四位, 摘要, 金额, 货币
@@ -169,8 +185,8 @@ class Importer(Importer):
         tags = set()
 
         # parse some basic info
-        date = parse(row[0]).date()
-        metadata["post_date"] = parse(row[1]).date()
+        date = parse_datetime(row[0]).date()
+        metadata["post_date"] = parse_datetime(row[1]).date()
         units = data.Amount(D(row[4]), row[5])
 
         _, _, card_number, orig_narration = row[:4]
@@ -204,7 +220,7 @@ class Importer(Importer):
             )
             return None
 
-        if m := match_destination_and_metadata(self.config, orig_narration, payee):
+        if m := compiled_mappings(self.config).match(orig_narration, payee):
             (account2, new_meta, new_tags) = m
             metadata.update(new_meta)
             tags = tags.union(new_tags)
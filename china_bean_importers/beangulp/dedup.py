@@ -0,0 +1,27 @@
+from china_bean_importers.dedup import DUPLICATE_META, find_duplicates, pair_payments
+
+
+def pair_wallet_payments(extracted, existing, window_days=3, merge_meta=True):
+    """
+    beangulp hook running china_bean_importers.dedup.pair_payments() on all
+    extracted entries; use functools.partial to change `window_days` or
+    `merge_meta`.
+    """
+    paired = pair_payments(
+        [entries for _, entries, _, _ in extracted], window_days, merge_meta
+    )
+    return [
+        (filename, entries, account, importer)
+        for (filename, _, account, importer), entries in zip(extracted, paired)
+    ]
+
+
+def mark_duplicates(importer, entries, existing) -> list:
+    """
+    Mark in place the `entries` that find_duplicates() finds in `existing`,
+    as beangulp does, and return those left to a similarity comparison.
+    """
+    pairs, rest = find_duplicates(importer, entries, existing)
+    for entry, target in pairs:
+        entry.meta[DUPLICATE_META] = target
+    return rest
@@ -1,11 +1,11 @@
 from beancount.core.data import D
 from beancount.core import data
 from beangulp import Importer
-from dateutil.parser import parse
 import re
 
 from china_bean_importers.common import *
-from china_bean_importers.beangulp.importer import FLAG
+from china_bean_importers.beangulp.dedup import mark_duplicates
+from china_bean_importers.beangulp.importer import FLAG, remember_parse, with_parse
 
 REGEX_YYYY_MM_DD = re.compile(r"(\d+)年(\d+)月(\d+)日")
 
@@ -60,41 +60,60 @@ class Importer(Importer):
     def __init__(self, config) -> None:
         super().__init__()
         self.config = config
+        self.config_sections = list(SHARED_CONFIG)
+        card_accounts(config)
+        self.dedup_by_amount = True
         self.match_keywords = [EMAIL_KEYWORD]
+        self.extensions = [".eml"]
 
+    def __getstate__(self):
+        return importer_state(self)
+
+    @timed("identify")
+    @remember_parse
     def identify(self, filepath: str):
         if filepath.upper().endswith(".EML"):
             self.type = "email"
 
             from bs4 import BeautifulSoup
-            from email import policy
-            from email.parser import Parser
             import quopri
 
-            with open(filepath, "r", encoding="utf-8") as f:
-                raw_email = Parser(policy=policy.default).parse(
-                    f)
+            raw_email = read_email(filepath)
+            if EMAIL_KEYWORD not in raw_email["Subject"]:
+                return False
+
+            def load():
                 raw_body_html = quopri.decodestring(
                     raw_email.get_body().get_payload())
-                self.body = BeautifulSoup(raw_body_html, features="lxml")
-                for i in self.body.find_all("td"):
-                    if "对账单生成日" in (i.string or ""):
-                        [y, m, d] = REGEX_YYYY_MM_DD.search(
-                            i.string).groups()
-                        self.stmt_date = parse(f"{y}-{m}-{d}")
-                is_workable = EMAIL_KEYWORD in raw_email["Subject"]
-                return is_workable
+                return BeautifulSoup(raw_body_html, features="lxml")
+
+            self.body = file_cache.get(filepath, "icbc_credit_card.body", load)
+            for i in self.body.find_all("td"):
+                if "对账单生成日" in (i.string or ""):
+                    [y, m, d] = REGEX_YYYY_MM_DD.search(
+                        i.string).groups()
+                    self.stmt_date = parse_datetime(f"{y}-{m}-{d}")
+            return True
         return False
 
+    @with_parse
     def account(self, filepath: str):
         return "icbc_credit_card"
 
+    @with_parse
     def date(self, filepath: str):
         if self.type == "email":
             return self.stmt_date
         return super().date(filepath)
 
     # common methods for table-based import
+    def deduplicate(self, entries, existing) -> None:
+        if rest := mark_duplicates(self, entries, existing):
+            super().deduplicate(rest, existing)
+
+    @timed("extract")
+    @with_parse
+    @cache_extract
     def extract(self, filepath: str, existing=None):
         return list(self.process_outer(self.body, filepath))
 
@@ -170,7 +189,7 @@ class Importer(Importer):
             if dst_currency != txn_currency:
                 metadata["original_amount"] = f"{txn_number} {txn_currency}"
 
-        date = parse(txn_object[C_DATE]).date()
+        date = parse_datetime(txn_object[C_DATE]).date()
 
         card_number = txn_object[C_CARD_NUMBER]
         account1 = find_account_by_card_number(self.config, card_number)
@@ -186,7 +205,7 @@ class Importer(Importer):
         if is_expense:
             units = -units
 
-        if m := match_destination_and_metadata(self.config, narration, payee):
+        if m := compiled_mappings(self.config).match(narration, payee):
             (account2, new_meta, new_tags) = m
             metadata.update(new_meta)
             tags = tags.union(new_tags)
@@ -1,30 +1,33 @@
-from dateutil.parser import parse
 from beancount.core import data
 from beancount.core.data import D
 import csv
 import re
 
 from china_bean_importers.common import *
+from china_bean_importers.dedup import serial_key
 from china_bean_importers.beangulp.importer import CsvOrXlsxImporter
 
 
 class Importer(CsvOrXlsxImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.config_sections.append(("importers", "wechat"))
         self.match_keywords = ["微信支付账单明细"]
         self.file_account_name = "wechat"
 
     def parse_metadata(self, filepath: str):
         if m := re.search(r"起始时间：\[([0-9]+-[0-9]+-[0-9]+)", self.full_content):
-            self.start = parse(m[1])
+            self.start = parse_datetime(m[1])
         if m := re.search(r"终止时间：\[([0-9]+-[0-9]+-[0-9]+)", self.full_content):
-            self.end = parse(m[1])
+            self.end = parse_datetime(m[1])
 
-    def extract(self, filepath: str, existing=None):
-        entries = []
+    def dedup_key(self, entry):
+        return serial_key(entry)
+
+    def iter_extract(self, filepath: str, existing=None):
         begin = False
 
-        for lineno, row in enumerate(csv.reader(self.content)):
+        for lineno, row in enumerate(self.csv_rows(filepath)):
             row = [col.strip() for col in row]
             #    0        1        2     3     4     5      6        7       8        9     10
             # 交易时间, 交易类型, 交易对方, 商品, 收/支, 金额, 支付方式, 当前状态, 交易单号, 商户单号, 备注
@@ -37,7 +40,7 @@ class Importer(CsvOrXlsxImporter):
                 tags = set()
 
                 # parse some basic info
-                time = parse(row[0])
+                time = parse_datetime(row[0])
                 units = data.Amount(D(row[5].removeprefix("¥")), "CNY")
                 (
                     _,
@@ -175,8 +178,8 @@ class Importer(CsvOrXlsxImporter):
                     account2 = source_config["lingqiantong_account"]
 
                 # 9. find by narration and payee
-                new_account, new_meta, new_tags = match_destination_and_metadata(
-                    self.config, narration, payee
+                new_account, new_meta, new_tags = compiled_mappings(self.config).match(
+                    narration, payee
                 )
                 if account2 is None:
                     account2 = new_account
@@ -236,6 +239,4 @@ class Importer(CsvOrXlsxImporter):
                         ),
                     ],
                 )
-                entries.append(txn)
-
-        return entries
+                yield txn
@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.ingest import importer
 from beancount.core import data, amount
 from beancount.core.number import D
@@ -7,13 +6,21 @@ import re
 import sys
 
 from china_bean_importers.common import *
+from china_bean_importers.dedup import dedup_extract
 
 
 class Importer(importer.ImporterProtocol):
     def __init__(self, config) -> None:
         super().__init__()
         self.config = config
+        self.config_sections = list(SHARED_CONFIG) + [("importers", "boc")]
+        card_accounts(config)
+        self.dedup_by_amount = True
         self.rate = None
+        self.extensions = [".pdf", ".eml"]
+
+    def __getstate__(self):
+        return importer_state(self)
 
     def get_config(self, cfg, account, narration):
         if "importers" not in self.config:
@@ -35,35 +42,34 @@ class Importer(importer.ImporterProtocol):
     def extract_repayment_rate(self, account, narration) -> bool:
         return self.get_config("extract_repayment_rate", account, narration)
 
+    @timed("identify")
     def identify(self, file):
         if file.name.upper().endswith(".PDF"):
             self.type = "pdf"
 
-            import fitz
-            if "中国银行信用卡" in file.name:
-                self.doc = fitz.open(file.name)
+            if "中国银行" not in file.name:
+                return False
+            doc = open_pdf(self.config, file.name)
+            if doc is None:
+                return False
+            if "中国银行信用卡" in file.name or "信用卡账单" in doc[0].get_text():
+                self.doc = doc
                 return True
-            elif "中国银行" in file.name:
-                doc = fitz.open(file.name)
-                if "信用卡账单" in doc[0].get_text():
-                    self.doc = doc
-                    return True
             return False
         elif file.name.upper().endswith(".EML"):
             self.type = "email"
             from bs4 import BeautifulSoup
-            import email
-            from email import policy
             import quopri
 
-            try:
-                raw_email = email.message_from_file(
-                    open(file.name), policy=policy.default
-                )
+            def load():
+                raw_email = read_email(file.name)
                 raw_body_html = quopri.decodestring(
                     raw_email.get_body().get_payload()
                 ).decode()
-                self.body = BeautifulSoup(raw_body_html, features="lxml")
+                return BeautifulSoup(raw_body_html, features="lxml")
+
+            try:
+                self.body = file_cache.get(file.name, "boc_credit_card.body", load)
                 return self.body.title.text == "中国银行电子帐单"
             except BaseException:
                 return False
@@ -83,18 +89,19 @@ class Importer(importer.ImporterProtocol):
                 elif begin:
                     parts = content.split("\n")
                     if len(parts) == 4:
-                        return parse(parts[1])
+                        return parse_datetime(parts[1])
                     elif len(parts) == 3 or len(parts) == 2:
-                        return parse(parts[0])
+                        return parse_datetime(parts[0])
                     else:
                         break
         elif self.type == "email":
             info_table = self.body.select("table.bill_sum_detail_table")[0]
             # 到期还款日 账单日 本期人民币欠款总计 本期外币欠款总计
             bill_date = info_table.find_all("td")[1].text
-            return parse(bill_date)
+            return parse_datetime(bill_date)
         return super().file_date(file)
 
+    @timed("extract_text_entries")
     def extract_text_entries(self):
         card_num_regex = re.compile(r".*\(卡号(:|：)(\d+)\)")
         currency_regex = re.compile(r".*(\(([a-zA-Z]+)\))(\w+)?交易明细.*", flags=re.DOTALL)
@@ -237,6 +244,9 @@ class Importer(importer.ImporterProtocol):
 
         return text_entries
 
+    @timed("extract")
+    @dedup_extract
+    @cache_extract
     def extract(self, file, existing_entries=None):
 
         # generate beancount posting entries
@@ -291,11 +301,11 @@ class Importer(importer.ImporterProtocol):
                 units = -units
 
             if trans_date != "":
-                date = parse(trans_date)
+                date = parse_datetime(trans_date)
                 if post_date != "":
                     metadata["post_date"] = post_date
             else:
-                date = parse(post_date)
+                date = parse_datetime(post_date)
                 # transaction date is empty
 
             if in_blacklist(self.config, orig_narration):
@@ -305,8 +315,8 @@ class Importer(importer.ImporterProtocol):
                 )
                 continue
 
-            if m := match_destination_and_metadata(
-                self.config, orig_narration, payee
+            if m := compiled_mappings(self.config).match(
+                orig_narration, payee
             ):  # match twice with narration
                 (account2, new_meta, new_tags) = m
                 metadata.update(new_meta)
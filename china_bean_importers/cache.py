@@ -0,0 +1,147 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def file_key(name):
+    # a file is considered unchanged as long as path, mtime and size agree
+    st = os.stat(name)
+    return os.path.abspath(name), st.st_mtime_ns, st.st_size
+
+
+class FileCache:
+    """
+    Size-bounded LRU cache of content derived from statement files.
+
+    Each file owns a small dict of cached values (decoded text per encoding,
+    PDF word dumps, parsed emails, ...), keyed by an arbitrary hashable
+    `kind`. Files are evicted as a whole, least recently used first, once
+    either `max_files` or `max_bytes` (summed on-disk sizes) is exceeded.
+    """
+
+    def __init__(self, max_files: int = 16, max_bytes: int = 128 * 1024 * 1024):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.files: OrderedDict[tuple, dict] = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+
+    def get(self, name, kind, loader):
+        """
+        Return the cached `kind` content of file `name`, calling `loader()` to
+        produce it on a miss. Exceptions raised by `loader` are not cached.
+        """
+        key = file_key(name)
+        size = key[2]
+        if size > self.max_bytes or self.max_files <= 0:
+            return loader()
+
+        with self.lock:
+            entry = self.files.get(key)
+            if entry is None:
+                self._drop_stale(key[0])
+                entry = {}
+                self.files[key] = entry
+                self.total_bytes += size
+                self._evict(keep=key)
+            else:
+                self.files.move_to_end(key)
+
+            if kind not in entry:
+                entry[kind] = loader()
+            return entry[kind]
+
+    def clear(self):
+        with self.lock:
+            self.files.clear()
+            self.total_bytes = 0
+
+    def _drop_stale(self, path):
+        # forget older versions of a file that has since been modified
+        for key in [k for k in self.files if k[0] == path]:
+            del self.files[key]
+            self.total_bytes -= key[2]
+
+    def _evict(self, keep):
+        while len(self.files) > 1 and (
+            len(self.files) > self.max_files or self.total_bytes > self.max_bytes
+        ):
+            key = next(iter(self.files))
+            if key == keep:
+                break
+            del self.files[key]
+            self.total_bytes -= key[2]
+
+
+# process-wide cache shared by all importers
+file_cache = FileCache()
+
+
+def content_hash(name) -> str:
+    """SHA-256 of the bytes of a file, computed once per version of the file."""
+
+    def load():
+        digest = hashlib.sha256()
+        with open(name, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    return file_cache.get(name, "sha256", load)
+
+
+class DiskCache:
+    """
+    Pickled values persisted under `directory`, one file per key.
+
+    Keys are hex digests chosen by the caller, so a value is never stale as
+    long as everything it depends on went into its key. Unreadable or
+    corrupted entries count as misses, and entries are written atomically,
+    so concurrent processes may share a directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.expanduser(directory)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pickle")
+
+    def load(self, key: str, default=None):
+        try:
+            with open(self.path(key), "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            # missing, written by an incompatible version, or truncated
+            return default
+
+    def store(self, key: str, value):
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # the cache is an optimization, failing to fill it is not an error
+            pass
+
+    def get(self, key: str, loader):
+        """
+        Return the value stored under `key`, calling `loader()` to produce
+        and store it on a miss. Returns (value, hit).
+        """
+        missing = object()
+        value = self.load(key, missing)
+        if value is not missing:
+            return value, True
+        value = loader()
+        self.store(key, value)
+        return value, False
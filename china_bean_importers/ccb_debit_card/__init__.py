@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.core import data, amount
 from beancount.core.number import D
 import csv
@@ -11,26 +10,26 @@ from china_bean_importers.importer import CsvImporter
 class Importer(CsvImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.dedup_by_amount = True
         self.encoding = "utf8"
         self.match_keywords = ["中国建设银行", "交易明细"]
         self.file_account_name = "ccb_debit_card"
 
     def parse_metadata(self, file):
         if m := re.search("起始日期:(\\d+)", self.full_content):
-            self.start = parse(m[1])
+            self.start = parse_datetime(m[1])
         if m := re.search("结束日期:(\\d+)", self.full_content):
-            self.end = parse(m[1])
+            self.end = parse_datetime(m[1])
         match = re.search("卡号/账号:([0-9]{19})", self.full_content)
         my_assert(match, "Invalid file, no card number found!", 0, 0)
         card_number = match[0]
         self.card_acc = find_account_by_card_number(self.config, card_number[-4:])
         my_assert(self.card_acc, f"Unknown card number {card_number}", 0, 0)
 
-    def extract(self, file, existing_entries=None):
-        entries = []
+    def iter_extract(self, file, existing_entries=None):
         begin = False
 
-        for lineno, row in enumerate(csv.reader(self.content)):
+        for lineno, row in enumerate(self.csv_rows(file.name)):
             row = [col.strip() for col in row]
             if len(row) <= 2:
                 continue
@@ -57,7 +56,7 @@ class Importer(CsvImporter):
                     attach,
                     payee,
                 ) = row[:10]
-                time = parse(time)
+                time = parse_datetime(time)
 
                 if cash == "人民币元":
                     cash = "CNY"
@@ -82,8 +81,8 @@ class Importer(CsvImporter):
 
                 my_assert(expense is not None, f"Unknown transaction type", lineno, row)
 
-                account2, new_meta, new_tags = match_destination_and_metadata(
-                    self.config, narration, payee
+                account2, new_meta, new_tags = compiled_mappings(self.config).match(
+                    narration, payee
                 )
                 metadata.update(new_meta)
                 tags = tags.union(new_tags)
@@ -118,6 +117,4 @@ class Importer(CsvImporter):
                         ),
                     ],
                 )
-                entries.append(txn)
-
-        return entries
+                yield txn
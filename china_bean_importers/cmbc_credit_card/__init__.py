@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.ingest import importer
 from beancount.core import data, amount
 from beancount.core.number import D
@@ -6,6 +5,7 @@ import csv
 import re
 
 from china_bean_importers.common import *
+from china_bean_importers.dedup import dedup_extract
 
 FOREIGN_CURR_TX = re.compile(
     r"^(?P<desc>.*?)\s*?(?P<country>[A-Z]+)(?P<amount>[-\d.]+)\s*(?P<currency>[A-Z]+)$"
@@ -17,37 +17,41 @@ class Importer(importer.ImporterProtocol):
     def __init__(self, config) -> None:
         super().__init__()
         self.config = config
+        self.config_sections = list(SHARED_CONFIG)
+        card_accounts(config)
+        self.dedup_by_amount = True
         self.match_keywords = ["卡号末四位", "交易日"]
+        self.extensions = [".csv", ".eml"]
 
+    def __getstate__(self):
+        return importer_state(self)
+
+    @timed("identify")
     def identify(self, file):
         if file.name.upper().endswith(".CSV"):
             self.type = "csv"
             try:
-                with open(file.name, "r", encoding="utf-8") as f:
-                    self.full_content = f.read()
-                    self.content = []
-                    for ln in self.full_content.splitlines():
-                        if (l := ln.strip()) != "":
-                            self.content.append(l)
-                    if "csv" in file.name and all(
-                        map(lambda c: c in self.full_content, self.match_keywords)
-                    ):
-                        return True
+                # look at the header first to avoid decoding unrelated files
+                head = read_head(file.name, "utf-8")
+                if not all(map(lambda c: c in head, self.match_keywords)):
+                    return False
+                self.full_content = read_text(file.name, "utf-8")
+                self.content = read_lines(file.name, "utf-8")
+                if "csv" in file.name and all(
+                    map(lambda c: c in self.full_content, self.match_keywords)
+                ):
+                    return True
                 return False
             except:
                 return False
         elif file.name.upper().endswith(".EML"):
             self.type = "email"
             from bs4 import BeautifulSoup
-            import email
-            from email import policy
-            import quopri, base64
+            import base64
             from html import unescape
 
             try:
-                raw_email = email.message_from_file(
-                    open(file.name), policy=policy.default
-                )
+                raw_email = read_email(file.name)
                 # weird encapsulation
                 raw_body_html = unescape(
                     base64.b64decode(
@@ -61,7 +65,7 @@ class Importer(importer.ImporterProtocol):
                 stmtDateCell = self.body.select("span#fixBand36")[
                     0
                 ].parent.nextSibling.font.text
-                self.stmt_date = parse(stmtDateCell)
+                self.stmt_date = parse_datetime(stmtDateCell)
                 return "民生信用卡" in raw_email["Subject"]
             except BaseException:
                 return False
@@ -72,11 +76,14 @@ class Importer(importer.ImporterProtocol):
     def file_date(self, file):
         if self.type == "csv":
             if len(self.content) > 1:
-                return parse(self.content[1].split(",")[1])
+                return parse_datetime(self.content[1].split(",")[1])
         elif self.type == "email":
             return self.stmt_date
         return super().file_date(file)
 
+    @timed("extract")
+    @dedup_extract
+    @cache_extract
     def extract(self, file, existing_entries=None):
 
         # generate beancount posting entries
@@ -91,6 +98,7 @@ class Importer(importer.ImporterProtocol):
         )
         return tx
 
+    @timed("extract_text_entries")
     def extract_text_entries(self):
         """
         extract entries in format of `generate_tx` from csv / eml
@@ -158,6 +166,7 @@ class Importer(importer.ImporterProtocol):
 
         return entries
 
+    @timed("generate_tx")
     def generate_tx(self, row: list, lineno: int, file):
         #   0      1        2       3    4    5
         # 交易日, 记账日, 卡号末四位, 摘要, 金额, 货币
@@ -167,8 +176,8 @@ class Importer(importer.ImporterProtocol):
         tags = set()
 
         # parse some basic info
-        date = parse(row[0]).date()
-        metadata["post_date"] = parse(row[1]).date()
+        date = parse_datetime(row[0]).date()
+        metadata["post_date"] = parse_datetime(row[1]).date()
         units = amount.Amount(D(row[4]), row[5])
 
         _, _, card_number, orig_narration = row[:4]
@@ -202,7 +211,7 @@ class Importer(importer.ImporterProtocol):
             )
             return None
 
-        if m := match_destination_and_metadata(self.config, orig_narration, payee):
+        if m := compiled_mappings(self.config).match(orig_narration, payee):
             (account2, new_meta, new_tags) = m
             metadata.update(new_meta)
             tags = tags.union(new_tags)
@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.core import data, amount
 from beancount.core.number import D
 import re
@@ -23,7 +22,7 @@ def gen_txn(config, file, parts, lineno, flag, card_acc):
     else:
         payee, payee_account = parts[9], ""
     narration = parts[3]
-    full_time = parse(parts[2])
+    full_time = parse_datetime(parts[2])
     date = full_time.date()
     units1 = amount.Amount(D(parts[4]), "CNY")
 
@@ -51,7 +50,7 @@ def gen_txn(config, file, parts, lineno, flag, card_acc):
 
     tags = set()
 
-    if m := match_destination_and_metadata(config, narration, payee):
+    if m := compiled_mappings(config).match(narration, payee):
         (account2, new_meta, new_tags) = m
         metadata.update(new_meta)
         tags = tags.union(new_tags)
@@ -101,6 +100,7 @@ def gen_txn(config, file, parts, lineno, flag, card_acc):
 class Importer(PdfImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.dedup_by_amount = True
         self.match_keywords = ["民生银行", "个人账户对账单"]
         self.file_account_name = "cmbc_debit_card"
         self.column_offsets = [22, 56, 97, 173, 335, 413, 448, 482, 533, 568, 696]
@@ -113,8 +113,8 @@ class Importer(PdfImporter):
             self.full_content,
         )
         assert match
-        self.start = parse(match[1])
-        self.end = parse(match[2])
+        self.start = parse_datetime(match[1])
+        self.end = parse_datetime(match[2])
 
         match = re.search(r"客户姓名:(\w+)", self.full_content)
         assert match
@@ -1,6 +1,14 @@
+import functools
 import re
 import sys
+import types
 import typing
+from collections import OrderedDict
+from datetime import datetime
+
+from china_bean_importers.automaton import KeywordAutomaton
+from china_bean_importers.cache import DiskCache, content_hash, file_cache, file_key
+from china_bean_importers.instrument import count as count_stat, timed
 
 
 card_tail_pattern = re.compile(r".*银行.*\(([0-9]{4})\)")
@@ -20,7 +28,17 @@ currency_code_map = {
     "澳大利亚元": "AUD",
 }
 
-SAME_AS_NARRATION = object()
+class _SameAsNarration:
+    # a singleton that stays identical across pickling, so that configs
+    # shipped to worker processes still compare with `is`
+    def __repr__(self):
+        return "SAME_AS_NARRATION"
+
+    def __reduce__(self):
+        return "SAME_AS_NARRATION"
+
+
+SAME_AS_NARRATION = _SameAsNarration()
 
 
 class BillDetailMapping(typing.NamedTuple):
@@ -77,68 +95,835 @@ class BillDetailMapping(typing.NamedTuple):
         return None, {}, set(), 0
 
 
+# attributes holding per-file parse results, which are neither needed nor
+# always picklable when importers are sent to worker processes
+PARSE_STATE = (
+    "full_content",
+    "content",
+    "head",
+    "tail",
+    "doc",
+    "body",
+    "reader",
+    "parsed_content",
+    "rows",
+    "parse_contexts",
+    "parse_key",
+    "parse_busy",
+)
+
+
+def importer_state(importer) -> dict:
+    return {k: v for k, v in importer.__dict__.items() if k not in PARSE_STATE}
+
+
+class DateFormat:
+    """
+    Strict parser of one date format, whose regex captures year, month, day
+    and optionally hour, minute and second (in `order`). parse() returns None
+    if the text does not have this format; results are memoized.
+    """
+
+    def __init__(self, regex, order=(0, 1, 2, 3, 4, 5), memo_size=4096):
+        self.regex = re.compile(regex)
+        self.order = order
+        self.parse = functools.lru_cache(maxsize=memo_size)(self._parse)
+
+    def _parse(self, text: str) -> typing.Optional[datetime]:
+        m = self.regex.fullmatch(text.strip())
+        if m is None:
+            return None
+        groups = m.groups()
+        return datetime(*(int(groups[i]) for i in self.order[: len(groups)]))
+
+
+YMD_HMS = DateFormat(r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2})")
+YMD = DateFormat(r"(\d{4})-(\d{2})-(\d{2})")
+YYYYMMDD = DateFormat(r"(\d{4})(\d{2})(\d{2})")
+CHINESE_YMD = DateFormat(r"(\d{4})年(\d{1,2})月(\d{1,2})日")
+# day first, as in HSBC statements; never guessed by parse_datetime()
+DMY = DateFormat(r"(\d{1,2})/(\d{1,2})/(\d{4})", order=(2, 1, 0))
+
+STATEMENT_DATE_FORMATS = [YMD_HMS, YMD, YYYYMMDD, CHINESE_YMD]
+
+
+def parse_datetime(text: str) -> datetime:
+    """
+    Drop-in replacement of dateutil's parse() for statement dates.
+    The common formats are parsed strictly, anything else (including invalid
+    dates) is left to dateutil.
+    """
+    for fmt in STATEMENT_DATE_FORMATS:
+        try:
+            result = fmt.parse(text)
+        except ValueError:
+            break
+        if result is not None:
+            return result
+
+    from dateutil.parser import parse
+
+    return parse(text)
+
+
 def match_card_tail(src):
     assert type(src) == str
     m = card_tail_pattern.match(src)
     return m[1] if m else None
 
 
-def open_pdf(config, name):
+# index in pdf_passwords of the password that unlocked each PDF, by file_key()
+_pdf_password_index: dict[tuple, int] = {}
+
+
+def pdf_password_order(config, name) -> list[int]:
+    """
+    Indices of config["pdf_passwords"] in the order they should be tried on
+    file `name`: the one that unlocked it before (in this process, or in an
+    earlier run if `cache_dir` is set) first.
+    """
+    count = len(config.get("pdf_passwords", ()))
+    known = _pdf_password_index.get(file_key(name))
+    if known is None and (cache := disk_cache(config)) is not None:
+        known = cache.load(cache_key(("pdf-password", content_hash(name))))
+    if known is None or known >= count:
+        return list(range(count))
+    return [known] + [i for i in range(count) if i != known]
+
+
+def unlock_pdf(config, name, doc) -> bool:
+    passwords = config.get("pdf_passwords", ())
+    order = pdf_password_order(config, name)
+    for i in order:
+        if doc.authenticate(passwords[i]):
+            _pdf_password_index[file_key(name)] = i
+            if i != order[0] and (cache := disk_cache(config)) is not None:
+                # only the index is stored, never the password itself
+                cache.store(cache_key(("pdf-password", content_hash(name))), i)
+            return True
+    return False
+
+
+def _open_pdf(config, name):
     import fitz
 
     doc = fitz.open(name)
-    if doc.is_encrypted:
-        for password in config["pdf_passwords"]:
-            doc.authenticate(password)
-        if doc.is_encrypted:
-            return None
+    if doc.is_encrypted and not unlock_pdf(config, name, doc):
+        return None
     return doc
 
 
-def find_account_by_card_number(config, card_number):
-    if isinstance(card_number, int):
-        card_number = str(card_number)
-    for prefix, accounts in config["card_accounts"].items():
-        for bank, numbers in accounts.items():
-            if card_number in numbers:
-                return f"{prefix}:{bank}:{card_number}"
+@timed("open_pdf")
+def open_pdf(config, name):
+    """
+    Opened and decrypted PDF, or None if no password in `pdf_passwords` fits.
+    The document is shared by all importers through file_cache, so it must
+    not be closed or modified in place.
+    """
+    passwords = tuple(config.get("pdf_passwords", ()))
+    return file_cache.get(name, ("pdf-doc", passwords), lambda: _open_pdf(config, name))
+
+
+# pages handled by each worker process at least, when `pdf_workers` is set
+PDF_PAGES_PER_WORKER = 16
+
+
+def _map_page_range(name, passwords, func, start, stop, args):
+    # runs in a worker process, which opens its own copy of the document
+    doc = _open_pdf({"pdf_passwords": passwords}, name)
+    try:
+        return func(doc, start, stop, *args)
+    finally:
+        doc.close()
+
+
+def map_pdf_pages(config, doc, func, *args) -> list:
+    """
+    Call `func(doc, start, stop, *args)`, which returns one result per page in
+    range(start, stop), and return the results of all pages in page order.
+
+    With `pdf_workers` > 1 in config, long documents are split into page
+    ranges handled by a pool of processes. `func` must then be a module-level
+    function. Documents modified in memory are always handled in-process.
+    """
+    import os
+
+    workers = min(
+        config.get("pdf_workers", 1),
+        os.cpu_count() or 1,
+        doc.page_count // PDF_PAGES_PER_WORKER,
+    )
+    if workers <= 1 or not doc.name or doc.is_dirty:
+        return func(doc, 0, doc.page_count, *args)
+
+    from concurrent.futures import ProcessPoolExecutor
 
-    return None
+    step = -(-doc.page_count // workers)
+    starts = range(0, doc.page_count, step)
+    # workers try the password known to unlock the document first
+    passwords = tuple(
+        config["pdf_passwords"][i] for i in pdf_password_order(config, doc.name)
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _map_page_range,
+                doc.name,
+                passwords,
+                func,
+                start,
+                min(start + step, doc.page_count),
+                args,
+            )
+            for start in starts
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def dump_pages(doc, start, stop):
+    pages = []
+    for i in range(start, stop):
+        page = doc[i]
+        pages.append((page.get_text("words"), page.get_text("text")))
+    return pages
+
+
+def table_pages(doc, start, stop, vertical_lines=None):
+    # cell grids of the tables found on each page
+    pages = []
+    for i in range(start, stop):
+        tables = doc[i].find_tables(vertical_lines=vertical_lines).tables
+        pages.append([tbl.extract() for tbl in tables])
+    return pages
+
+
+@timed("pdf_tables")
+def read_pdf_tables(config, name, doc, vertical_lines=None):
+    """
+    Cell grids of the tables on each page of an opened PDF, detected once and
+    shared through file_cache.
+    """
+
+    def load():
+        return map_pdf_pages(config, doc, table_pages, vertical_lines)
+
+    passwords = tuple(config.get("pdf_passwords", ()))
+    lines = tuple(vertical_lines) if vertical_lines is not None else None
+    kind = ("pdf-tables", passwords, lines)
+    return file_cache.get(name, kind, lambda: cached(config, name, kind, load))
+
+
+@timed("pdf_text")
+def dump_pdf(doc, config=None):
+    pages = (
+        map_pdf_pages(config, doc, dump_pages)
+        if config is not None
+        else dump_pages(doc, 0, doc.page_count)
+    )
+    words = []
+    texts = []
+    for page_words, text in pages:
+        words.extend(page_words)
+        texts.append(text)
+    return words, "".join(texts)
+
+
+def read_pdf(config, name, doc=None):
+    """
+    Words and full text of a PDF, shared by all importers through file_cache.
+    `doc` may be passed if the caller has already opened the file. Returns
+    None if the PDF cannot be decrypted.
+    """
+
+    def load():
+        opened = doc if doc is not None else open_pdf(config, name)
+        return dump_pdf(opened, config) if opened is not None else None
+
+    passwords = tuple(config.get("pdf_passwords", ()))
+    kind = ("pdf", passwords)
+    return file_cache.get(name, kind, lambda: cached(config, name, kind, load))
+
+
+@timed("decode")
+def read_text(name, encoding="utf-8"):
+    def load():
+        with open(name, "r", encoding=encoding) as f:
+            return f.read()
+
+    return file_cache.get(name, ("text", encoding), load)
+
+
+@timed("decode")
+def read_head(name, encoding="utf-8", size=16384):
+    # decoded text of at most the first `size` bytes, for sniffing
+    import codecs
+
+    def load():
+        with open(name, "rb") as f:
+            raw = f.read(size)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        return decoder.decode(raw, final=len(raw) < size)
+
+    return file_cache.get(name, ("head", encoding, size), load)
+
+
+@timed("decode")
+def read_xlsx_head(name, rows=30):
+    # first rows of the first sheet as comma-separated text, for sniffing
+    import openpyxl
+
+    def load():
+        wb = openpyxl.load_workbook(name, read_only=True)
+        try:
+            lines = []
+            for row in wb.worksheets[0].iter_rows(max_row=rows, values_only=True):
+                lines.append(",".join("" if v is None else str(v) for v in row))
+            return "\n".join(lines)
+        finally:
+            wb.close()
+
+    return file_cache.get(name, ("xlsx-head", rows), load)
+
+
+def iter_xlsx_rows(name):
+    """
+    Rows of the first sheet of an xlsx file as lists of strings, read lazily
+    in read-only mode. Empty cells become "" and trailing empty rows are
+    dropped, as in a csv export of the sheet.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(name, read_only=True)
+    try:
+        # empty rows are held back until a non-empty row follows
+        empty = []
+        for values in wb.worksheets[0].iter_rows(values_only=True):
+            row = ["" if v is None else str(v) for v in values]
+            if not any(row):
+                if len(row) > 1:
+                    empty.append(row)
+                continue
+            yield from empty
+            empty.clear()
+            yield row
+    finally:
+        wb.close()
+
+
+@timed("decode")
+def read_lines(name, encoding="utf-8"):
+    # non-empty lines with surrounding whitespace removed
+    def load():
+        lines = []
+        for ln in read_text(name, encoding).splitlines():
+            if (l := ln.strip()) != "":
+                lines.append(l)
+        return lines
+
+    return file_cache.get(name, ("lines", encoding), load)
+
+
+def iter_lines(name, encoding="utf-8"):
+    # the lines of read_lines(), read lazily from disk
+    with open(name, "r", encoding=encoding) as f:
+        for ln in f:
+            for l in ln.splitlines():
+                if (l := l.strip()) != "":
+                    yield l
+
+
+@timed("decode")
+def read_window(name, encoding="utf-8", size=32):
+    """
+    First and last `size` lines of read_lines() and the total number of
+    lines, in a single pass over the file with bounded memory.
+    """
+    from collections import deque
+
+    def load():
+        head = []
+        tail = deque(maxlen=size)
+        count = 0
+        for line in iter_lines(name, encoding):
+            if count < size:
+                head.append(line)
+            tail.append(line)
+            count += 1
+        return head, list(tail), count
+
+    return file_cache.get(name, ("window", encoding, size), load)
+
+
+@timed("decode")
+def read_email(name):
+    import email
+    from email import policy
+
+    def load():
+        with open(name, "r", encoding="utf-8") as f:
+            return email.message_from_file(f, policy=policy.default)
+
+    return file_cache.get(name, "email", load)
+
+
+# bumped whenever the layout of cached values changes
+CACHE_FORMAT = 1
+
+
+def disk_cache(config) -> typing.Optional[DiskCache]:
+    directory = config.get("cache_dir")
+    return DiskCache(directory) if directory else None
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """
+    Digest of the package version and sources, so that results cached by one
+    version (or an edited checkout) are never served to another.
+    """
+    import hashlib
+    import os
+    from importlib import metadata
+
+    digest = hashlib.sha256()
+    try:
+        digest.update(metadata.version("china_bean_importers").encode())
+    except metadata.PackageNotFoundError:
+        pass
+    root = os.path.dirname(os.path.abspath(__file__))
+    for directory, dirs, files in sorted(os.walk(root)):
+        dirs.sort()
+        for f in sorted(files):
+            if f.endswith(".py"):
+                path = os.path.join(directory, f)
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, "rb") as source:
+                    digest.update(source.read())
+    return digest.hexdigest()
+
+
+# config read by the helpers of this module, and so by nearly every importer
+SHARED_CONFIG = (
+    "card_accounts",
+    "detail_mappings",
+    "unknown_expense_account",
+    "unknown_income_account",
+    ("importers", "card_narration_whitelist"),
+    ("importers", "card_narration_blacklist"),
+)
+
+
+def _canonical_code(code) -> list:
+    consts = [
+        _canonical_code(c) if hasattr(c, "co_code") else canonical(c)
+        for c in code.co_consts
+    ]
+    return [code.co_code.hex(), consts, list(code.co_names)]
+
+
+def _global_names(code) -> set:
+    # names a function and the functions nested in it may look up as globals
+    names = set(code.co_names)
+    for c in code.co_consts:
+        if hasattr(c, "co_code"):
+            names |= _global_names(c)
+    return names
+
+
+def _canonical_globals(func, seen) -> list:
+    described = []
+    for name in sorted(_global_names(func.__code__)):
+        if name not in func.__globals__:
+            continue
+        value = func.__globals__[name]
+        if isinstance(value, types.ModuleType):
+            described.append((name, f"module {value.__name__}"))
+        else:
+            described.append((name, canonical(value, seen)))
+    return described
+
+
+def canonical(value, seen: frozenset = frozenset()):
+    """
+    A description of a config value that only depends on its content, for
+    hashing: dicts and sets are sorted, functions (like the callables of
+    boc_credit_card) are described by their code, defaults, closure and the
+    globals they read rather than their address, bound methods also by the
+    object they are bound to.
+    """
+    if isinstance(value, dict):
+        return sorted((repr(k), canonical(v, seen)) for k, v in value.items())
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(canonical(v, seen)) for v in value)
+    if isinstance(value, (list, tuple)):
+        # named tuples such as BillDetailMapping keep their type name
+        return [type(value).__name__] + [canonical(v, seen) for v in value]
+    if isinstance(value, functools.partial):
+        return [
+            "partial",
+            canonical(value.func, seen),
+            canonical(value.args, seen),
+            canonical(value.keywords, seen),
+        ]
+    name = f"{getattr(value, '__module__', None)}.{getattr(value, '__qualname__', '')}"
+    if id(value) in seen:
+        # a function or object reaching itself, e.g. through its globals
+        return name if callable(value) else type(value).__qualname__
+    bound = getattr(value, "__self__", None)
+    if callable(value) and not isinstance(bound, (types.ModuleType, type(None))):
+        # methods of an object, whose state they may read
+        func = getattr(value, "__func__", None)
+        func = name if func is None else canonical(func, seen)
+        return ["method", func, canonical(bound, seen)]
+    if hasattr(value, "__code__"):
+        seen = seen | {id(value)}
+        cells = [c.cell_contents for c in value.__closure__ or ()]
+        return [
+            name,
+            _canonical_code(value.__code__),
+            canonical(value.__defaults__ or (), seen),
+            canonical(value.__kwdefaults__ or {}, seen),
+            canonical(cells, seen),
+            _canonical_globals(value, seen),
+        ]
+    if value is SAME_AS_NARRATION:
+        return "SAME_AS_NARRATION"
+    if isinstance(value, type) or (callable(value) and hasattr(value, "__qualname__")):
+        # classes and builtins
+        return name
+    if hasattr(value, "__dict__"):
+        # the default repr() of objects includes their address
+        seen = seen | {id(value)}
+        return [type(value).__qualname__, canonical(vars(value), seen)]
+    return repr(value)
+
+
+_MISSING = object()
+
+
+def config_value(config, path):
+    # `path` is a top-level key, or a tuple of keys into nested dicts
+    value = config
+    for key in (path,) if isinstance(path, str) else path:
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def config_fingerprint(config, paths=None) -> str:
+    """
+    Stable digest of the parts of config at `paths` (see config_value()), or
+    of the whole config if `paths` is None. It is the same across runs and
+    processes as long as these parts are equal, so that it can key caches
+    that outlive a config edit unrelated to them.
+    """
+    import hashlib
+
+    if paths is None:
+        described = canonical(config)
+    else:
+        described = [
+            (repr(path), "missing" if v is _MISSING else canonical(v))
+            for path in sorted(set(paths), key=repr)
+            for v in [config_value(config, path)]
+        ]
+    return hashlib.sha256(repr(described).encode()).hexdigest()
+
+
+def cache_key(parts) -> str:
+    import hashlib
+
+    return hashlib.sha256(repr((CACHE_FORMAT, parts)).encode()).hexdigest()
+
+
+def cached(config, name, kind, loader):
+    """
+    Value derived from file `name`, reused from the `cache_dir` set in config
+    as long as the file content, `kind` and the package are unchanged. `kind`
+    must describe everything else the value depends on.
+    """
+    cache = disk_cache(config)
+    if cache is None:
+        return loader()
+
+    key = cache_key((kind, content_hash(name), code_version()))
+    value, hit = cache.get(key, loader)
+    count_stat("cache_hits" if hit else "cache_misses")
+    return value
+
+
+def cached_entries(config, importer, name, extract) -> list:
+    """
+    Entries extracted from file `name` by `importer`, reused from `cache_dir`
+    while the file, the package and the `config_sections` of the importer
+    (the whole config if it has none) are unchanged. Warnings printed by the
+    extraction are not repeated when the cache is hit.
+    """
+    if disk_cache(config) is None:
+        return extract()
+
+    sections = getattr(importer, "config_sections", None)
+    fingerprint = config_fingerprint(config, sections)
+    kind = ("entries", type(importer).__module__, fingerprint)
+    source, entries = cached(config, name, kind, lambda: (name, extract()))
+    if source == name:
+        return entries
+    # the same content was cached under another path
+    return [
+        e._replace(meta={**e.meta, "filename": name})
+        if e.meta and e.meta.get("filename") == source
+        else e
+        for e in entries
+    ]
+
+
+def cache_extract(extract):
+    """Decorator serving an importer's extract() through cached_entries()."""
+
+    @functools.wraps(extract)
+    def wrapper(self, file, *args, **kwargs):
+        # beancount 2 passes file memos, beangulp passes paths
+        name = getattr(file, "name", file)
+
+        def run():
+            if "detail_mappings" in self.config:
+                # rebuilt here if edited since the last file, not per row
+                compiled_mappings(self.config, check=True)
+            return extract(self, file, *args, **kwargs)
+
+        return cached_entries(self.config, self, name, run)
+
+    return wrapper
+
+
+class CardAccounts:
+    """
+    Reverse index of config["card_accounts"], from card number (usually the
+    last four digits) to account. A number registered under more than one
+    account is a configuration error.
+    """
+
+    def __init__(self, card_accounts):
+        self.source = card_accounts
+        self.accounts: dict[str, str] = {}
+        for prefix, accounts in card_accounts.items():
+            for bank, numbers in accounts.items():
+                for number in numbers:
+                    account = f"{prefix}:{bank}:{number}"
+                    if self.accounts.setdefault(number, account) != account:
+                        raise ValueError(
+                            f"Card number {number} is registered as both "
+                            f"{self.accounts[number]} and {account}"
+                        )
+
+    def find(self, card_number) -> typing.Optional[str]:
+        if isinstance(card_number, int):
+            card_number = str(card_number)
+        return self.accounts.get(card_number)
+
+
+# card indices by id() of the card_accounts dict they were built from
+_card_accounts: dict[int, CardAccounts] = {}
+
+
+def card_accounts(config) -> CardAccounts:
+    """
+    CardAccounts of config["card_accounts"], built once per dict. Assign a new
+    dict to config["card_accounts"] to change the cards afterwards.
+    """
+    accounts = config["card_accounts"]
+    index = _card_accounts.get(id(accounts))
+    if index is None or index.source is not accounts:
+        if len(_card_accounts) >= 8:
+            _card_accounts.clear()
+        index = CardAccounts(accounts)
+        _card_accounts[id(accounts)] = index
+    return index
 
 
-def match_destination_and_metadata(config, desc, payee):
-    account = None
-    mapping = None
-    priority = 0
-    metadata = {}
-    tags = set()
-
-    # merge all possible results
-    for m in config["detail_mappings"]:
-        _mapping: BillDetailMapping = m
-        new_account, new_metadata, new_tags, new_priority = _mapping.match(desc, payee)
-        # check compatibility
-        if account is None or new_priority > priority:
-            account, mapping, priority = new_account, m, new_priority
-        elif new_account is not None and new_priority == priority:
-            if new_account.startswith(account):
-                # new account is deeper than or equal to current account
-                account, mapping = new_account, m
-            elif not account.startswith(new_account):
-                my_warn(
-                    f"""Conflict destination accounts found for narration {desc} and payee {payee}:
+def find_account_by_card_number(config, card_number):
+    return card_accounts(config).find(card_number)
+
+
+class MatchCacheInfo(typing.NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class CompiledMappings:
+    """
+    config["detail_mappings"] prepared for matching many rows: match logic is
+    validated, SAME_AS_NARRATION resolved and the result of each mapping
+    precomputed once. All keywords are compiled into one automaton, so each
+    string is scanned once instead of once per keyword of every mapping.
+
+    Results are memoized per (desc, payee) in an LRU cache of `cache_size`
+    entries, as statements keep repeating the same merchants.
+    """
+
+    def __init__(self, mappings, cache_size: int = 4096):
+        self.source = mappings
+        self.mappings = tuple(mappings)
+        self.fingerprint = mappings_fingerprint(self.mappings)
+        self.cache: OrderedDict[tuple, tuple] = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        keyword_ids: dict[str, int] = {}
+        # keyword id -> indices of mappings using it for narration / payee
+        self.narration_users: list[list[int]] = []
+        self.payee_users: list[list[int]] = []
+
+        def add(keywords, i, users):
+            for keyword in keywords:
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(keyword_ids)
+                    self.narration_users.append([])
+                    self.payee_users.append([])
+                users[keyword_ids[keyword]].append(i)
+
+        self.and_logic = set()
+        self.results = []
+        for i, m in enumerate(self.mappings):
+            if m.match_logic not in ("OR", "AND"):
+                raise ValueError(f"Invalid match_logic {m.match_logic!r} in {m}")
+            if m.match_logic == "AND":
+                self.and_logic.add(i)
+            if m.narration_keywords is not None:
+                add(m.narration_keywords, i, self.narration_users)
+            if m.payee_keywords is not None:
+                keywords = (
+                    m.narration_keywords
+                    if m.payee_keywords is SAME_AS_NARRATION
+                    else m.payee_keywords
+                )
+                add(keywords, i, self.payee_users)
+            self.results.append(m.canonicalize())
+
+        self.automaton = KeywordAutomaton(keyword_ids)
+
+    def matching(self, desc, payee) -> list[int]:
+        """Indices of the mappings matching desc and payee, in order."""
+        narration = set()
+        if desc is not None:
+            for k in self.automaton.search(desc):
+                narration.update(self.narration_users[k])
+        payee_matched = set()
+        if payee is not None:
+            for k in self.automaton.search(payee):
+                payee_matched.update(self.payee_users[k])
+
+        matched = (narration | payee_matched) - self.and_logic
+        matched.update(narration & payee_matched & self.and_logic)
+        return sorted(matched)
+
+    @timed("match")
+    def match(
+        self, desc, payee
+    ) -> tuple[typing.Optional[str], dict[str, object], set[str]]:
+        """Destination account, metadata and tags merged from all matches."""
+        key = (desc, payee)
+        result = self.cache.get(key)
+        if result is None:
+            self.misses += 1
+            result = self.resolve(desc, payee)
+            if self.cache_size > 0:
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+
+        account, metadata, tags, warnings = result
+        for warning in warnings:
+            my_warn(warning, 0, "")
+        return account, dict(metadata), set(tags)
+
+    def cache_info(self) -> MatchCacheInfo:
+        return MatchCacheInfo(self.hits, self.misses, self.cache_size, len(self.cache))
+
+    def resolve(self, desc, payee):
+        account = None
+        mapping = None
+        priority = 0
+        metadata = {}
+        tags = set()
+        warnings = []
+        last = -1
+
+        # merge all possible results
+        for i in self.matching(desc, payee) + [len(self.mappings)]:
+            # mappings that did not match still take over when nothing has
+            # been matched yet or the current priority is negative
+            if i > last + 1 and (account is None or priority < 0):
+                account, mapping, priority = None, self.mappings[i - 1], 0
+            last = i
+            if i == len(self.mappings):
+                break
+
+            m = self.mappings[i]
+            new_account, new_metadata, new_tags, new_priority = self.results[i]
+            # check compatibility
+            if account is None or new_priority > priority:
+                account, mapping, priority = new_account, m, new_priority
+            elif new_account is not None and new_priority == priority:
+                if new_account.startswith(account):
+                    # new account is deeper than or equal to current account
+                    account, mapping = new_account, m
+                elif not account.startswith(new_account):
+                    warnings.append(
+                        f"""Conflict destination accounts found for narration {desc} and payee {payee}:
 Old account {account} from {mapping}
 New account {new_account} from {m}
 
-""",
-                    0,
-                    "",
-                )
+"""
+                    )
 
-        metadata.update(new_metadata)
-        tags.update(new_tags)
+            metadata.update(new_metadata)
+            tags.update(new_tags)
 
-    return account, metadata, tags
+        return account, metadata, frozenset(tags), tuple(warnings)
+
+
+def mappings_fingerprint(mappings) -> str:
+    import hashlib
+
+    return hashlib.sha256(repr(canonical(tuple(mappings))).encode()).hexdigest()
+
+
+# compiled mappings by id() of the detail_mappings list they were built from
+_compiled_mappings: dict[int, CompiledMappings] = {}
+
+
+def compiled_mappings(config, check: bool = False) -> CompiledMappings:
+    """
+    CompiledMappings of config["detail_mappings"], built on first use and
+    rebuilt (dropping cached matches) if the list is replaced or, when `check`
+    is set, if its content changed. Rows only look the list up; every extract
+    checks its content once beforehand (see cache_extract()).
+    The size of the match cache can be set by `mapping_cache_size`.
+    """
+    mappings = config["detail_mappings"]
+    compiled = _compiled_mappings.get(id(mappings))
+    if compiled is not None and compiled.source is mappings:
+        if not check or compiled.fingerprint == mappings_fingerprint(mappings):
+            return compiled
+    if len(_compiled_mappings) >= 8:
+        _compiled_mappings.clear()
+    compiled = CompiledMappings(mappings, config.get("mapping_cache_size", 4096))
+    _compiled_mappings[id(mappings)] = compiled
+    return compiled
+
+
+def match_destination_and_metadata(config, desc, payee):
+    return compiled_mappings(config).match(desc, payee)
 
 
 def match_currency_code(currency_name):
@@ -1,5 +1,18 @@
-from beancount.ingest.extract import DUPLICATE_META
-from collections import defaultdict
+import bisect
+import datetime
+import functools
+import typing
+from collections import Counter, defaultdict
+
+from china_bean_importers.common import parse_datetime
+
+# beancount.ingest.extract.DUPLICATE_META, which beangulp calls DUPLICATE;
+# spelled out so that this module works with both
+DUPLICATE_META = "__duplicate__"
+# payment_method metadata of the entries of wechat and alipay_mobile
+WALLET_PAYMENT_METHODS = ("微信支付", "支付宝")
+# metadata that is not copied from a bank entry to its wallet entry
+UNMERGED_META = ("filename", "lineno", DUPLICATE_META)
 
 
 def find_wechat_family(new_entries_list, existing_entries):
@@ -51,3 +64,370 @@ def find_wechat_family(new_entries_list, existing_entries):
             mod_entries.append(entry)
         mod_entries_list.append((key, mod_entries))
     return mod_entries_list
+
+
+def is_wallet_entry(entry) -> bool:
+    return entry.meta.get("payment_method") in WALLET_PAYMENT_METHODS
+
+
+def posting_keys(entry):
+    # (account, number, currency) of every posting with an amount
+    for posting in getattr(entry, "postings", None) or ():
+        if posting.units is not None and posting.units.number is not None:
+            units = posting.units
+            yield posting.account, units.number, units.currency
+
+
+def own_posting_key(entry):
+    # (account, number, currency) of the first posting, which importers put
+    # on the account of the statement: the card or bank account, or what paid
+    # a wallet entry (a card, or the wallet balance)
+    postings = getattr(entry, "postings", None)
+    if postings:
+        units = postings[0].units
+        if units is not None and units.number is not None:
+            return postings[0].account, units.number, units.currency
+    return None
+
+
+class PostingIndex:
+    """
+    Hash index of entries by the account, number and currency of some of
+    their postings, each bucket sorted by date. The same transaction seen by
+    two sources (a wallet bill and a bank statement, or two overlapping
+    statements) has the same amount on the same account, a few days apart at
+    most, so it is found by a lookup and a bisection.
+
+    Entries are looked up by their own posting only (see own_posting_key()):
+    a shared counter leg, like the same amount spent on Expenses:Food with
+    two cards, does not make two entries the same transaction.
+    """
+
+    def __init__(self):
+        self.buckets: dict[tuple, list] = defaultdict(list)
+        self.count = 0
+
+    def add(self, entry, value, keys):
+        # the running count keeps bucket items unique, and orders equal dates
+        self.count += 1
+        for key in keys:
+            bisect.insort(self.buckets[key], (entry.date, self.count, value))
+
+    def pop(self, entry, window, used: set, lo=None, hi=None, accept=None):
+        """
+        Value of the entry closest in date to `entry` indexed under its own
+        posting, dated in [lo - window, hi + window] (both default to the
+        date of `entry`), that is not in `used` and passes `accept(value)`.
+        It is then added to `used`.
+        """
+        lo = (lo or entry.date) - window
+        hi = (hi or entry.date) + window
+        best = None
+        bucket = self.buckets.get(own_posting_key(entry), ())
+        for n in range(bisect.bisect_left(bucket, (lo,)), len(bucket)):
+            date, count, value = bucket[n]
+            if date > hi:
+                break
+            distance = abs(date - entry.date)
+            if best is not None and distance >= best[0]:
+                if date >= entry.date:
+                    # only farther entries follow
+                    break
+                continue
+            if count not in used and (accept is None or accept(value)):
+                best = (distance, count, value)
+        if best is None:
+            return None
+        used.add(best[1])
+        return best[2]
+
+
+def pair_payments(entry_lists, window_days=3, merge_meta=True) -> list[list]:
+    """
+    Pair the bank statement entries of card payments made through WeChat Pay
+    or Alipay with the wallet entries of the same payments, across all the
+    lists in `entry_lists`, and return the lists with every paired bank entry
+    marked with DUPLICATE_META. With `merge_meta`, metadata of the bank entry
+    missing from the wallet entry (like post_date) is copied to it.
+
+    Entries are joined on the account, number and currency of their own
+    posting (see own_posting_key()), so a bank entry only pairs with a wallet
+    entry paid by its card, and dates at most `window_days` apart, each wallet
+    entry being paired at most once, in time linear in the number of entries
+    for typical ledgers.
+    """
+    window = datetime.timedelta(days=window_days)
+    index = PostingIndex()
+    for i, entries in enumerate(entry_lists):
+        for j, entry in enumerate(entries):
+            key = own_posting_key(entry)
+            if is_wallet_entry(entry) and key is not None:
+                index.add(entry, (i, j), [key])
+    used = set()
+
+    result = [list(entries) for entries in entry_lists]
+    for i, entries in enumerate(result):
+        for j, entry in enumerate(entries):
+            if is_wallet_entry(entry) or entry.meta.get(DUPLICATE_META):
+                continue
+            position = index.pop(entry, window, used)
+            if position is None:
+                continue
+            entries[j] = entry._replace(meta={**entry.meta, DUPLICATE_META: True})
+            if merge_meta:
+                k, n = position
+                wallet = result[k][n]
+                extra = {
+                    key: value
+                    for key, value in entry.meta.items()
+                    if key not in wallet.meta and key not in UNMERGED_META
+                }
+                if extra:
+                    result[k][n] = wallet._replace(meta={**wallet.meta, **extra})
+    return result
+
+
+def pair_wallet_payments(
+    new_entries_list, existing_entries, window_days=3, merge_meta=True
+):
+    """
+    beancount.ingest hook running pair_payments() on all extracted entries;
+    use functools.partial to change `window_days` or `merge_meta`.
+    """
+    paired = pair_payments(
+        [entries for _, entries in new_entries_list], window_days, merge_meta
+    )
+    return [(key, entries) for (key, _), entries in zip(new_entries_list, paired)]
+
+
+def serial_key(entry):
+    # 交易单号 of wechat and alipay_mobile entries
+    serial = entry.meta.get("serial")
+    return ("serial", serial) if serial else None
+
+
+class LedgerIndex:
+    """
+    Index of existing entries, built once per ledger and later only
+    extended with the entries appended to it, as beangulp does after each
+    file. An index whose ledger changed otherwise (beangulp's similarity
+    comparison sorts it in place) must be rebuilt, see is_extended().
+    """
+
+    def __init__(self, existing):
+        self.source = existing
+        # entries of source indexed so far, in order
+        self.indexed: list = []
+
+    def is_extended(self) -> bool:
+        # the indexed entries are still the first ones of source; the list
+        # comparison checks identity first, so this is cheap when they are
+        size = len(self.indexed)
+        return len(self.source) >= size and self.source[:size] == self.indexed
+
+    def update(self):
+        added = self.source[len(self.indexed) :]
+        for entry in added:
+            self.add(entry)
+        self.indexed.extend(added)
+
+    def add(self, entry):
+        raise NotImplementedError
+
+
+class KeyIndex(LedgerIndex):
+    # existing entries by the key an importer's dedup_key() gives them; keys
+    # need not be unique, like two identical purchases on the same day
+    def __init__(self, existing, key):
+        super().__init__(existing)
+        self.key = key
+        self.entries: dict[typing.Hashable, list] = {}
+
+    def add(self, entry):
+        key = self.key(entry)
+        if key is not None:
+            self.entries.setdefault(key, []).append(entry)
+
+
+class AmountIndex(LedgerIndex):
+    # existing entries by the amounts of all their postings, for
+    # dedup_by_amount: the ledger may book the card account on any of them
+    def __init__(self, existing):
+        super().__init__(existing)
+        self.postings = PostingIndex()
+
+    def add(self, entry):
+        self.postings.add(entry, entry, posting_keys(entry))
+
+
+# ledger indexes by kind and id() of the existing entries
+_ledger_indexes: dict[tuple, LedgerIndex] = {}
+
+
+def ledger_index(kind, existing, build) -> LedgerIndex:
+    key = (kind, id(existing))
+    index = _ledger_indexes.get(key)
+    if index is None or index.source is not existing or not index.is_extended():
+        if len(_ledger_indexes) >= 32:
+            _ledger_indexes.clear()
+        index = build(existing)
+        _ledger_indexes[key] = index
+    index.update()
+    return index
+
+
+def post_date(entry) -> typing.Optional[datetime.date]:
+    value = entry.meta.get("post_date")
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return parse_datetime(value).date()
+        except (ValueError, OverflowError):
+            pass
+    return None
+
+
+def same_time(entry, other) -> bool:
+    # two payments on the same day at different times are different payments
+    time, other_time = entry.meta.get("time"), other.meta.get("time")
+    return not (entry.date == other.date and time and other_time and time != other_time)
+
+
+def find_duplicates(importer, entries, existing) -> tuple[list, list]:
+    """
+    Match `entries` against `existing` without comparing them pairwise.
+    Returns the (entry, existing entry) pairs found, and the entries left to
+    a similarity comparison.
+
+    Importers defining dedup_key() look their entries up by key (entries
+    without a key are left), each existing entry being matched at most once
+    per call. Importers with `dedup_by_amount`, like bank
+    statements, look up existing entries with the same amount on the same
+    account and dates at most `dedup_window_days` (2 by default) apart,
+    extended to the post_date of the entry if any.
+    """
+    if getattr(importer, "dedup_key", None) is not None:
+        index = ledger_index(
+            id(importer), existing, lambda e: KeyIndex(e, importer.dedup_key)
+        )
+        pairs = []
+        unkeyed = []
+        # existing entries of each key already matched
+        taken: dict[typing.Hashable, int] = defaultdict(int)
+        for entry in entries:
+            key = importer.dedup_key(entry)
+            if key is None:
+                unkeyed.append(entry)
+                continue
+            targets = index.entries.get(key, ())
+            if taken[key] < len(targets):
+                pairs.append((entry, targets[taken[key]]))
+                taken[key] += 1
+        return pairs, unkeyed
+
+    if getattr(importer, "dedup_by_amount", False):
+        index = ledger_index("amount", existing, AmountIndex)
+        window_days = importer.config.get("dedup_window_days", 2)
+        window = datetime.timedelta(days=window_days)
+        used = set()
+        pairs = []
+        for entry in entries:
+            dates = [entry.date]
+            if (posted := post_date(entry)) is not None:
+                dates.append(posted)
+            target = index.postings.pop(
+                entry,
+                window,
+                used,
+                min(dates),
+                max(dates),
+                accept=functools.partial(same_time, entry),
+            )
+            if target is not None:
+                pairs.append((entry, target))
+        return pairs, []
+
+    return [], list(entries)
+
+
+def find_in_earlier_files(importer, name, entries) -> list:
+    """
+    The `entries` of file `name` whose dedup_key() was also given to entries
+    that `importer` extracted from other files earlier in the run, as when
+    overlapping statements are imported together, each key being matched
+    at most as many times as it occurs in one of these files. The keys of
+    `entries` replace those of earlier extractions of the same file.
+    """
+    earlier = Counter()
+    for other, keys in importer.extracted_keys.items():
+        if other != name:
+            earlier |= keys
+    keys = importer.extracted_keys[name] = Counter()
+    found = []
+    for entry in entries:
+        key = importer.dedup_key(entry)
+        if key is not None:
+            keys[key] += 1
+            if keys[key] <= earlier[key]:
+                found.append(entry)
+    return found
+
+
+def dedup_extract(extract):
+    """
+    Decorator marking the entries returned by the extract() of a
+    beancount.ingest importer that find_duplicates() finds in
+    `existing_entries`, or that find_in_earlier_files() finds in the other
+    files of the run. beancount.ingest only compares each file with the
+    ledger, while beangulp appends every file to it.
+    """
+
+    @functools.wraps(extract)
+    def wrapper(self, file, existing_entries=None):
+        entries = extract(self, file, existing_entries)
+        duplicates = set()
+        if existing_entries:
+            pairs, _ = find_duplicates(self, entries, existing_entries)
+            duplicates.update(id(entry) for entry, _ in pairs)
+        if getattr(self, "dedup_key", None) is not None:
+            found = find_in_earlier_files(self, file.name, entries)
+            duplicates.update(id(entry) for entry in found)
+        if not duplicates:
+            return entries
+        return [
+            entry._replace(meta={**entry.meta, DUPLICATE_META: True})
+            if id(entry) in duplicates
+            else entry
+            for entry in entries
+        ]
+
+    return wrapper
+
+
+def find_duplicate_entries(new_entries_list, existing_entries):
+    """
+    Drop-in replacement of the default beancount.ingest hook of the same
+    name, which compares every extracted entry with the ledger by
+    similarity: entries already marked by dedup_extract() (or an earlier
+    hook) are left out of the comparison.
+    """
+    from beancount.ingest import extract
+
+    unmarked = [
+        (key, [entry for entry in entries if DUPLICATE_META not in entry.meta])
+        for key, entries in new_entries_list
+    ]
+    compared = extract.find_duplicate_entries(unmarked, existing_entries)
+    result = []
+    for (key, entries), (_, marked) in zip(new_entries_list, compared):
+        marked = iter(marked)
+        result.append(
+            (
+                key,
+                [e if DUPLICATE_META in e.meta else next(marked) for e in entries],
+            )
+        )
+    return result
@@ -10,13 +10,14 @@ from china_bean_importers.importer import CsvImporter
 
 def parse_date(str):
     DATE_FORMAT = "%d/%m/%Y"
-    return datetime.strptime(str, DATE_FORMAT)
+    return DMY.parse(str) or datetime.strptime(str, DATE_FORMAT)
 
 
 class Importer(CsvImporter):
 
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.config_sections.append(("importers", "hsbc_hk"))
         self.encoding = "utf-8"
         self.match_keywords = ["Billing currency", "Description"]
         self.file_account_name = "hsbc_hk"
@@ -38,7 +39,7 @@ class Importer(CsvImporter):
         return super().identify(file)
 
     def parse_metadata(self, file):
-        self.reader = csv.DictReader(self.content)
+        self.reader = csv.DictReader(self.csv_lines(file.name))
         self.parsed_content = list(self.reader)
         if "Transaction date" in self.reader.fieldnames:
             self.type = "Credit"
@@ -58,8 +59,17 @@ class Importer(CsvImporter):
         self.start = self.parsed_content[0]["D"]
         self.end = self.parsed_content[-1]["D"]
 
-    def extract(self, file, existing_entries=None):
-        entries = []
+    def dedup_key(self, entry):
+        # statements have no transaction id, but date, amount and description
+        # of a posting to one of the mapped accounts are specific enough
+        accounts = self.config["importers"]["hsbc_hk"].get("account_mapping", {})
+        for posting in getattr(entry, "postings", None) or ():
+            if posting.account in accounts.values() and posting.units is not None:
+                units = posting.units
+                return ("hsbc_hk", entry.date, posting.account, units, entry.narration)
+        return None
+
+    def iter_extract(self, file, existing_entries=None):
         use_cnh = self.config["importers"]["hsbc_hk"].get("use_cnh", False)
 
         for c in self.parsed_content:
@@ -101,8 +111,8 @@ class Importer(CsvImporter):
             # find account2
             expense = units.number < 0
             account2 = unknown_account(self.config, expense)
-            new_account, new_meta, new_tags = match_destination_and_metadata(
-                self.config, narration, payee
+            new_account, new_meta, new_tags = compiled_mappings(self.config).match(
+                narration, payee
             )
             if new_account:
                 account2 = new_account
@@ -137,6 +147,4 @@ class Importer(CsvImporter):
                     ),
                 ],
             )
-            entries.append(txn)
-
-        return entries
+            yield txn
@@ -1,10 +1,10 @@
 from beancount.core.number import D
 from beancount.core import data, amount
 from beancount.ingest import importer
-from dateutil.parser import parse
 import re
 
 from china_bean_importers.common import *
+from china_bean_importers.dedup import dedup_extract
 
 REGEX_YYYY_MM_DD = re.compile(r"(\d+)年(\d+)月(\d+)日")
 
@@ -58,30 +58,39 @@ class Importer(importer.ImporterProtocol):
     def __init__(self, config) -> None:
         super().__init__()
         self.config = config
+        self.config_sections = list(SHARED_CONFIG)
+        card_accounts(config)
+        self.dedup_by_amount = True
         self.match_keywords = [EMAIL_KEYWORD]
+        self.extensions = [".eml"]
 
+    def __getstate__(self):
+        return importer_state(self)
+
+    @timed("identify")
     def identify(self, file):
         if file.name.upper().endswith(".EML"):
             self.type = "email"
 
             from bs4 import BeautifulSoup
-            from email import policy
-            from email.parser import Parser
             import quopri
 
-            with open(file.name, "r", encoding="utf-8") as f:
-                raw_email = Parser(policy=policy.default).parse(
-                    f)
+            raw_email = read_email(file.name)
+            if EMAIL_KEYWORD not in raw_email["Subject"]:
+                return False
+
+            def load():
                 raw_body_html = quopri.decodestring(
                     raw_email.get_body().get_payload())
-                self.body = BeautifulSoup(raw_body_html, features="lxml")
-                for i in self.body.find_all("td"):
-                    if "对账单生成日" in (i.string or ""):
-                        [y, m, d] = REGEX_YYYY_MM_DD.search(
-                            i.string).groups()
-                        self.stmt_date = parse(f"{y}-{m}-{d}")
-                is_workable = EMAIL_KEYWORD in raw_email["Subject"]
-                return is_workable
+                return BeautifulSoup(raw_body_html, features="lxml")
+
+            self.body = file_cache.get(file.name, "icbc_credit_card.body", load)
+            for i in self.body.find_all("td"):
+                if "对账单生成日" in (i.string or ""):
+                    [y, m, d] = REGEX_YYYY_MM_DD.search(
+                        i.string).groups()
+                    self.stmt_date = parse_datetime(f"{y}-{m}-{d}")
+            return True
         return False
 
     def file_account(self, file):
@@ -93,6 +102,9 @@ class Importer(importer.ImporterProtocol):
         return super().file_date(file)
 
     # common methods for table-based import
+    @timed("extract")
+    @dedup_extract
+    @cache_extract
     def extract(self, file, existing_entries=None):
         return list(self.process_outer(self.body, file.name))
 
@@ -168,7 +180,7 @@ class Importer(importer.ImporterProtocol):
             if dst_currency != txn_currency:
                 metadata["original_amount"] = f"{txn_number} {txn_currency}"
 
-        date = parse(txn_object[C_DATE]).date()
+        date = parse_datetime(txn_object[C_DATE]).date()
 
         card_number = txn_object[C_CARD_NUMBER]
         account1 = find_account_by_card_number(self.config, card_number)
@@ -184,7 +196,7 @@ class Importer(importer.ImporterProtocol):
         if is_expense:
             units = -units
 
-        if m := match_destination_and_metadata(self.config, narration, payee):
+        if m := compiled_mappings(self.config).match(narration, payee):
             (account2, new_meta, new_tags) = m
             metadata.update(new_meta)
             tags = tags.union(new_tags)
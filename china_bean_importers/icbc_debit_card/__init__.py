@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.core import data, amount
 from beancount.core.number import D
 import re
@@ -18,7 +17,7 @@ def gen_txn(config, file, parts, lineno, flag, card_acc, real_name):
     # Split date and time
     date_str = parts[0][:10]
     time_str = parts[0][10:]
-    date = parse(date_str).date()
+    date = parse_datetime(date_str).date()
 
     # parts[2]: 币别
     currency_code = match_currency_code(parts[4])
@@ -58,7 +57,7 @@ def gen_txn(config, file, parts, lineno, flag, card_acc, real_name):
 
     tags = set()
 
-    if m := match_destination_and_metadata(config, narration, payee):
+    if m := compiled_mappings(config).match(narration, payee):
         (account2, new_meta, new_tags) = m
         metadata.update(new_meta)
         tags = tags.union(new_tags)
@@ -109,6 +108,7 @@ def gen_txn(config, file, parts, lineno, flag, card_acc, real_name):
 class Importer(PdfTableImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.dedup_by_amount = True
         self.match_keywords = ["中国工商银行借记账户历史明细（电子版）"]
         self.file_account_name = "icbc_debit_card"
         self.vertical_lines = None
@@ -120,8 +120,8 @@ class Importer(PdfTableImporter):
             self.full_content,
         )
         assert match
-        self.start = parse(match[1])
-        self.end = parse(match[2])
+        self.start = parse_datetime(match[1])
+        self.end = parse_datetime(match[2])
 
         match = re.search(r"户名：\s*(\w+)", self.full_content)
         assert match
@@ -1,8 +1,12 @@
-from dateutil.parser import parse
 from beancount.ingest import importer
+from collections import Counter
 from datetime import datetime
+import csv
+import os
 
 from china_bean_importers.common import *
+from china_bean_importers.dedup import dedup_extract
+from china_bean_importers.instrument import IMPORTER_STAGES, instrument_methods, timed
 
 
 class BaseImporter(importer.ImporterProtocol):
@@ -13,13 +17,42 @@ class BaseImporter(importer.ImporterProtocol):
         self.file_account_name: str = None
         self.full_content: str = ""
         self.content: list[str] = []
+        # first and last lines of text files, and their number of lines
+        self.head: list[str] = []
+        self.tail: list[str] = []
+        self.line_count: int = 0
         self.start: datetime = None
         self.end: datetime = None
         self.filetype: str = None
+        # dispatch hints for china_bean_importers.registry
+        self.extensions: list[str] = None
+        self.encodings: list[str] = None
+        self.signature_keywords: list[str] = None
+        # parts of config the output depends on, see config_fingerprint()
+        self.config_sections: list = list(SHARED_CONFIG)
+        # dedup_key() counts of the files extracted so far, by file name
+        self.extracted_keys: dict[str, Counter] = {}
+        # raises on card numbers registered twice, which identify() would hide
+        card_accounts(config)
+
+    def __getstate__(self):
+        return importer_state(self)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # per-stage timers, only active once instrument.recorder is enabled
+        instrument_methods(cls, IMPORTER_STAGES)
 
     def identify(self, file):
         raise "Unimplemented"
 
+    def sniff(self, file) -> bool:
+        """
+        Cheap pre-check run by identify() before the whole file is loaded.
+        Returning False rejects the file; True lets identify() decide.
+        """
+        return True
+
     def parse_metadata(self, file):
         raise "Unimplemented"
 
@@ -36,17 +69,22 @@ class BaseImporter(importer.ImporterProtocol):
         if self.end:
             return f"to.{self.end.date().isoformat()}.{self.filetype}"
 
-    # common methods for table-based import
+    @timed("extract")
+    @dedup_extract
+    @cache_extract
     def extract(self, file, existing_entries=None):
-        return list(
-            filter(
-                lambda x: x is not None,
-                [
-                    self.generate_tx(r, i, file)
-                    for i, r in enumerate(self.extract_rows())
-                ],
-            )
-        )
+        return list(self.iter_extract(file, existing_entries))
+
+    # common methods for table-based import
+    def iter_extract(self, file, existing_entries=None):
+        """
+        Generate the entries of a file one at a time, so that they can be
+        processed or written before the whole file has been converted.
+        """
+        for i, r in enumerate(self.extract_rows()):
+            txn = self.generate_tx(r, i, file)
+            if txn is not None:
+                yield txn
 
     def extract_rows(self) -> list[list[str]]:
         raise "Unimplemented"
@@ -55,61 +93,133 @@ class BaseImporter(importer.ImporterProtocol):
         raise "Unimplemented"
 
 
-class CsvImporter(BaseImporter):
+class TextImporter(BaseImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
         self.encoding: str = "utf-8"
+        # bytes read by sniff() when looking for match_keywords
+        self.sniff_size: int = 16384
+        # files this large are streamed, lines kept for parse_metadata()
+        self.stream_size: int = 4 * 1024 * 1024
+        self.window_lines: int = 32
+        # file that `content` was loaded from
+        self.content_name: str = None
+
+    def csv_lines(self, name):
+        """
+        Non-empty stripped lines of a text file, for csv.reader(). These come
+        from `content` if it has been loaded from that file, else are streamed
+        from disk.
+        """
+        if self.content and self.content_name == name:
+            return self.content
+        return iter_lines(name, self.encoding)
+
+    def csv_rows(self, name):
+        """
+        Rows of a statement, read lazily: csv files through csv_lines(), xlsx
+        files directly from the first sheet.
+        """
+        if name.endswith(".xlsx"):
+            return iter_xlsx_rows(name)
+        return csv.reader(self.csv_lines(name))
+
+    def load_text(self, name, stream_size):
+        # files of at least stream_size bytes are only read as a window of
+        # lines, with full_content holding the first ones
+        self.content_name = name
+        if os.path.getsize(name) < stream_size:
+            self.full_content = read_text(name, self.encoding)
+            self.content = read_lines(name, self.encoding)
+            self.head = self.content[: self.window_lines]
+            self.tail = self.content[-self.window_lines :]
+            self.line_count = len(self.content)
+        else:
+            self.head, self.tail, self.line_count = read_window(
+                name, self.encoding, self.window_lines
+            )
+            self.full_content = "\n".join(self.head)
+            self.content = []
+
+
+class CsvImporter(TextImporter):
+    def __init__(self, config) -> None:
+        super().__init__(config)
         self.filetype = "csv"
+        self.extensions = [".csv"]
+
+    def sniff(self, file) -> bool:
+        if "csv" not in file.name:
+            return False
+        try:
+            head = read_head(file.name, self.encoding, self.sniff_size)
+        except (OSError, UnicodeDecodeError):
+            return False
+        return all(map(lambda c: c in head, self.match_keywords))
 
     def identify(self, file):
         if self.match_keywords is None:
             raise "match_keywords not set"
         try:
-            with open(file.name, "r", encoding=self.encoding) as f:
-                self.full_content = f.read()
-                self.content = []
-                for ln in self.full_content.splitlines():
-                    if (l := ln.strip()) != "":
-                        self.content.append(l)
-                if "csv" in file.name and all(
-                    map(lambda c: c in self.full_content, self.match_keywords)
-                ):
-                    self.parse_metadata(file)
-                    return True
+            if not self.sniff(file):
+                return False
+            self.load_text(file.name, self.stream_size)
+            if "csv" in file.name and all(
+                map(lambda c: c in self.full_content, self.match_keywords)
+            ):
+                self.parse_metadata(file)
+                return True
         except BaseException:
             return False
 
-class CsvOrXlsxImporter(BaseImporter):
+class CsvOrXlsxImporter(TextImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
-        self.encoding: str = "utf-8"
         self.filetype = "csv"
+        self.extensions = [".csv", ".xlsx"]
+        # rows of xlsx files read by sniff() when looking for match_keywords
+        self.sniff_rows: int = 30
+
+    def sniff(self, file) -> bool:
+        try:
+            if file.name.endswith(".xlsx"):
+                try:
+                    head = read_xlsx_head(file.name, self.sniff_rows)
+                except ImportError:
+                    # let identify() report the missing dependency
+                    return True
+            elif file.name.endswith(".csv"):
+                head = read_head(file.name, self.encoding, self.sniff_size)
+            else:
+                return False
+        except (OSError, UnicodeDecodeError):
+            return False
+        return all(map(lambda c: c in head, self.match_keywords))
 
     def identify(self, file):
         if self.match_keywords is None:
             raise "match_keywords not set"
         try:
+            if not self.sniff(file):
+                return False
             if file.name.endswith(".xlsx"):
                 try:
-                    import pandas as pd
                     import openpyxl
                 except ImportError:
-                    print(f"WARNING: missing pandas or openpyxl, cannot parse xlsx\n", file=sys.stderr)
+                    print(f"WARNING: missing openpyxl, cannot parse xlsx\n", file=sys.stderr)
                     return False
 
-                df = pd.read_excel(file.name)
-                csv = df.to_csv(index=False)
+                # only the first rows are loaded here, csv_rows() streams the rest
                 self.filetype = "xlsx"
-                self.full_content = csv
+                self.full_content = read_xlsx_head(file.name, self.window_lines)
+                self.content = []
+                self.head = self.full_content.splitlines()
+                self.tail = []
+                self.line_count = 0
             elif file.name.endswith(".csv"):
-                with open(file.name, "r", encoding=self.encoding) as f:
-                    self.full_content = f.read()
+                self.load_text(file.name, self.stream_size)
             else:
                 return False
-            self.content = []
-            for ln in self.full_content.splitlines():
-                if (l := ln.strip()) != "":
-                    self.content.append(l)
             if all(
                 map(lambda c: c in self.full_content, self.match_keywords)
             ):
@@ -125,6 +235,7 @@ class PdfImporter(BaseImporter):
 
         super().__init__(config)
         self.filetype = "pdf"
+        self.extensions = [".pdf"]
         self.column_offsets: list[int] = None
         self.content_start_keyword: str = None
         self.content_start_regex = None
@@ -138,15 +249,10 @@ class PdfImporter(BaseImporter):
         if "pdf" not in file.name.lower():
             return False
 
-        doc = open_pdf(self.config, file.name)
-        if doc is None:
+        dump = read_pdf(self.config, file.name)
+        if dump is None:
             return False
-
-        self.full_content = ""
-        self.content = []
-        for page in doc:
-            self.content.extend(page.get_text("words"))
-            self.full_content += page.get_text("text")
+        self.content, self.full_content = dump
 
         if all(map(lambda c: c in self.full_content, self.match_keywords)):
             self.parse_metadata(file)
@@ -218,9 +324,11 @@ class PdfTableImporter(BaseImporter):
 
         super().__init__(config)
         self.filetype = "pdf"
+        self.extensions = [".pdf"]
         self.vertical_lines: list[int] = None
         self.header_first_cell: str = None
         self.header_first_cell_regex = None
+        self.rows: list[list[str]] = []
 
     def identify(self, file):
         if self.match_keywords is None:
@@ -232,17 +340,15 @@ class PdfTableImporter(BaseImporter):
         doc = open_pdf(self.config, file.name)
         if doc is None:
             return False
-        doc = self.preprocess_doc(doc)
-
-        self.full_content = ""
-        self.content = []
-        self.doc = doc
-        for page in doc:
-            self.content.extend(page.get_text("words"))
-            self.full_content += page.get_text("text")
+        processed = self.preprocess_doc(doc)
+        if processed is doc:
+            self.content, self.full_content = read_pdf(self.config, file.name, doc)
+        else:
+            self.content, self.full_content = dump_pdf(processed, self.config)
+        self.doc = processed
 
         if all(map(lambda c: c in self.full_content, self.match_keywords)):
-            self.populate_rows(doc)
+            self.populate_rows(processed, file.name if processed is doc else None)
             self.parse_metadata(file)
             return True
         else:
@@ -251,13 +357,20 @@ class PdfTableImporter(BaseImporter):
     def preprocess_doc(self, doc):
         return doc
 
-    def populate_rows(self, doc):
+    def populate_rows(self, doc, name=None):
+        # tables are detected once per document, then served to extract_rows()
+        if name is not None:
+            pages = read_pdf_tables(self.config, name, doc, self.vertical_lines)
+        else:
+            pages = map_pdf_pages(self.config, doc, table_pages, self.vertical_lines)
         self.rows = []
-        for page in doc:
-            for tbl in page.find_tables(vertical_lines=self.vertical_lines).tables:
+        for tables in pages:
+            for tbl in tables:
                 # TODO: Check vertical offset
                 self.rows.extend(
-                    filter(lambda x: not self.is_row_filtered(x), tbl.extract())
+                    [(cell or "").replace("\n", "").strip() for cell in row]
+                    for row in tbl
+                    if not self.is_row_filtered(row)
                 )
 
     def is_row_filtered(self, row):
@@ -265,21 +378,12 @@ class PdfTableImporter(BaseImporter):
             return True
         if self.header_first_cell is not None and self.header_first_cell == row[0]:
             return True
-        if self.header_first_cell_regex is not None and self.header_first_cell.match(
-            row[0]
+        if (
+            self.header_first_cell_regex is not None
+            and self.header_first_cell_regex.match(row[0])
         ):
             return True
         return False
 
     def extract_rows(self):
-        rows = []
-        for page in self.doc:
-            for tbl in page.find_tables().tables:
-                # TODO: Check vertical offset
-                rows.extend(
-                    map(
-                        lambda row: [cell.replace("\n", "").strip() for cell in row],
-                        filter(lambda x: not self.is_row_filtered(x), tbl.extract()),
-                    )
-                )
-        return rows
+        return self.rows
@@ -0,0 +1,174 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+# stages that start a new (importer, file) scope for the stages they call
+SCOPED_STAGES = {"identify", "extract"}
+# importer methods timed by BaseImporter for every subclass defining them
+IMPORTER_STAGES = (
+    "identify",
+    "parse_metadata",
+    "populate_rows",
+    "extract",
+    "extract_rows",
+    "extract_text_entries",
+    "generate_tx",
+)
+# stages whose result length is added to a counter
+COUNTED_STAGES = {
+    "extract": "entries",
+    "extract_rows": "rows",
+    "extract_text_entries": "rows",
+}
+
+
+def importer_name(importer) -> str:
+    return type(importer).__module__.rsplit(".", 1)[-1]
+
+
+def scope_file(file) -> str:
+    # beancount 2 passes file memos, beangulp passes paths
+    return getattr(file, "name", file)
+
+
+class Recorder:
+    """
+    Opt-in timers and counters for the stages of an import.
+
+    Time spent in each stage is accumulated per importer and per file, as
+    (calls, seconds), together with named counters such as the number of
+    rows and entries produced. Stages nested in identify() or extract(),
+    like PDF layout or rule matching, are attributed to the importer and
+    file being processed. Nothing is recorded while disabled, and the
+    instrumented code only pays for testing `enabled`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.scope: tuple = (None, None)
+        self.active: set[str] = set()
+        self.times: dict[tuple, list] = defaultdict(lambda: [0, 0.0])
+        self.counters: dict[tuple, int] = defaultdict(int)
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.times.clear()
+        self.counters.clear()
+
+    def call(self, stage, func, args, kwargs):
+        outer = self.scope
+        if stage in SCOPED_STAGES and len(args) > 1:
+            self.scope = (importer_name(args[0]), scope_file(args[1]))
+        # a stage calling an overridden version of itself is only timed once
+        self.active.add(stage)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            if stage in COUNTED_STAGES and hasattr(result, "__len__"):
+                self.count(COUNTED_STAGES[stage], len(result))
+            return result
+        finally:
+            record = self.times[self.scope + (stage,)]
+            record[0] += 1
+            record[1] += time.perf_counter() - start
+            self.active.discard(stage)
+            self.scope = outer
+
+    def count(self, name, n=1):
+        self.counters[self.scope + (name,)] += n
+
+    def rows(self, per_file=True) -> list[dict]:
+        """Recorded stages and counters, one dict per importer (and file)."""
+        merged: dict[tuple, dict] = {}
+
+        def row(importer, file):
+            key = (importer, file if per_file else None)
+            if key not in merged:
+                merged[key] = {"importer": importer, "stages": {}, "counters": {}}
+                if per_file:
+                    merged[key]["file"] = file
+            return merged[key]
+
+        for (importer, file, stage), (calls, seconds) in self.times.items():
+            stages = row(importer, file)["stages"]
+            total = stages.setdefault(stage, {"calls": 0, "seconds": 0.0})
+            total["calls"] += calls
+            total["seconds"] += seconds
+        for (importer, file, name), n in self.counters.items():
+            counters = row(importer, file)["counters"]
+            counters[name] = counters.get(name, 0) + n
+        return sorted(
+            merged.values(), key=lambda r: (r["importer"] or "", r.get("file") or "")
+        )
+
+    def report(self, out=sys.stderr, per_file=False):
+        for r in self.rows(per_file):
+            title = r["importer"] or "(no importer)"
+            if per_file:
+                title += f" {r['file']}"
+            counters = " ".join(f"{k}={v}" for k, v in sorted(r["counters"].items()))
+            print(f"{title} {counters}".rstrip(), file=out)
+            stages = sorted(r["stages"].items(), key=lambda s: -s[1]["seconds"])
+            for stage, total in stages:
+                ms = total["seconds"] * 1000
+                print(f"  {stage:<20} {total['calls']:>8} calls {ms:>10.1f} ms", file=out)
+
+    def dump(self, path, per_file=True):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.rows(per_file), f, indent=2, ensure_ascii=False)
+
+
+# process-wide recorder shared by all importers
+recorder = Recorder()
+
+
+def timed(stage):
+    """Decorator recording calls of a function as `stage` when enabled."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled or stage in recorder.active:
+                return func(*args, **kwargs)
+            return recorder.call(stage, func, args, kwargs)
+
+        wrapper.timed_stage = stage
+        return wrapper
+
+    return decorate
+
+
+def count(name, n=1):
+    if recorder.enabled:
+        recorder.count(name, n)
+
+
+def instrument_methods(cls, stages):
+    """Wrap the methods named in `stages` that `cls` itself defines."""
+    for stage in stages:
+        method = cls.__dict__.get(stage)
+        if callable(method) and not hasattr(method, "timed_stage"):
+            setattr(cls, stage, timed(stage)(method))
+
+
+def _dump_at_exit(target):
+    if target in ("1", "-"):
+        recorder.report(per_file=True)
+    else:
+        recorder.dump(target)
+
+
+# CHINA_BEAN_IMPORTERS_STATS=- prints a report to stderr at exit, any other
+# value is taken as the path of a JSON dump
+if os.environ.get("CHINA_BEAN_IMPORTERS_STATS"):
+    recorder.enable()
+    atexit.register(_dump_at_exit, os.environ["CHINA_BEAN_IMPORTERS_STATS"])
@@ -0,0 +1,96 @@
+import os
+from collections import defaultdict
+
+from china_bean_importers.common import read_head, file_cache
+
+# binary formats are recognized by their magic bytes instead of keywords
+MAGIC = {
+    ".pdf": b"%PDF",
+    ".xlsx": b"PK\x03\x04",
+    ".eml": None,
+}
+SNIFF_SIZE = 16384
+
+
+def file_name(file):
+    # beancount 2 passes file memos, beangulp passes paths
+    return getattr(file, "name", file)
+
+
+def read_prefix(name, size=1024):
+    def load():
+        with open(name, "rb") as f:
+            return f.read(size)
+
+    return file_cache.get(name, ("prefix", size), load)
+
+
+class ImporterRegistry:
+    """
+    Dispatch index over a list of importers.
+
+    Importers may declare `extensions` (lower-case suffixes such as ".csv"),
+    `encodings` of their text files and `signature_keywords` expected in the
+    first bytes of those files (defaulting to `match_keywords`). The index is
+    built once, so each file is only handed to the identify() of importers
+    that could possibly accept it. Importers that declare no extensions are
+    always candidates.
+    """
+
+    def __init__(self, importers):
+        self.importers = list(importers)
+        self.by_extension: dict[str, list[int]] = defaultdict(list)
+        self.generic: list[int] = []
+        for i, importer in enumerate(self.importers):
+            extensions = getattr(importer, "extensions", None)
+            if not extensions:
+                self.generic.append(i)
+                continue
+            for ext in extensions:
+                self.by_extension[ext.lower()].append(i)
+
+    def candidates(self, file) -> list:
+        name = file_name(file)
+        ext = os.path.splitext(name)[1].lower()
+        indices = sorted(self.by_extension.get(ext, []) + self.generic)
+        if not indices:
+            return []
+
+        try:
+            if ext in MAGIC:
+                magic = MAGIC[ext]
+                if magic is not None and magic not in read_prefix(name):
+                    return [self.importers[i] for i in self.generic]
+                return [self.importers[i] for i in indices]
+            return [
+                self.importers[i]
+                for i in indices
+                if i in self.generic or self.match_signature(self.importers[i], name)
+            ]
+        except OSError:
+            return []
+
+    def match_signature(self, importer, name) -> bool:
+        keywords = getattr(importer, "signature_keywords", None)
+        if keywords is None:
+            keywords = getattr(importer, "match_keywords", None)
+        if not keywords:
+            return True
+        encodings = getattr(importer, "encodings", None) or [
+            getattr(importer, "encoding", "utf-8")
+        ]
+        for encoding in encodings:
+            try:
+                head = read_head(name, encoding, SNIFF_SIZE)
+            except UnicodeDecodeError:
+                continue
+            if all(map(lambda c: c in head, keywords)):
+                return True
+        return False
+
+    def identify(self, file):
+        """Return the first candidate importer accepting `file`, or None."""
+        for importer in self.candidates(file):
+            if importer.identify(file):
+                return importer
+        return None
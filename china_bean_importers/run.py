@@ -0,0 +1,123 @@
+"""
+Identify and extract a batch of statements in a pool of worker processes.
+
+Usage: python -m china_bean_importers.run [-j WORKERS] IMPORT_SCRIPT PATH...
+
+IMPORT_SCRIPT is the script holding the importer list, either as `CONFIG`
+(beancount 2 ingest) or as `importers` (beangulp). Entries are printed in
+file name order, regardless of which worker finished first.
+"""
+
+import argparse
+import multiprocessing
+import os
+import runpy
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from china_bean_importers.registry import ImporterRegistry
+
+# per-process state, set up once by _init_worker()
+_state = {}
+
+
+def find_files(paths) -> list[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in names)
+        else:
+            files.append(path)
+    return sorted(set(os.path.abspath(f) for f in files))
+
+
+def is_legacy(importer) -> bool:
+    # beancount 2 importers take file memos and name their methods file_*
+    return hasattr(importer, "file_account")
+
+
+def wrap_file(importer, path):
+    if is_legacy(importer):
+        from beancount.ingest import cache
+
+        return cache.get_file(path)
+    return path
+
+
+def _init_worker(importers, existing):
+    _state["registry"] = ImporterRegistry(importers)
+    _state["existing"] = existing
+
+
+def _extract_file(path):
+    registry: ImporterRegistry = _state["registry"]
+    for importer in registry.candidates(path):
+        file = wrap_file(importer, path)
+        if importer.identify(file):
+            entries = importer.extract(file, _state["existing"])
+            return path, registry.importers.index(importer), entries
+    return path, None, []
+
+
+def extract(importers, paths, workers=None, existing=None):
+    """
+    Identify and extract every file under `paths` using `workers` processes
+    (all CPUs if None, in-process if 1). Returns (path, importer, entries)
+    for each identified file, sorted by path.
+
+    Workers are forked where possible, so importers and their config are
+    inherited as-is; with other start methods they must be picklable.
+    """
+    importers = list(importers)
+    files = find_files(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(files) <= 1:
+        _init_worker(importers, existing)
+        results = map(_extract_file, files)
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(importers, existing),
+        )
+        with executor:
+            chunksize = max(1, len(files) // (workers * 4))
+            results = list(executor.map(_extract_file, files, chunksize=chunksize))
+
+    return [
+        (path, importers[index], entries)
+        for path, index, entries in results
+        if index is not None
+    ]
+
+
+def main(argv=None):
+    from beancount.parser import printer
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("script", help="import script defining CONFIG or importers")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    namespace = runpy.run_path(args.script)
+    importers = namespace.get("CONFIG") or namespace.get("importers")
+    if not importers:
+        parser.error(f"no CONFIG or importers defined in {args.script}")
+
+    for path, importer, entries in extract(importers, args.paths, args.workers):
+        print(f"**** {path}")
+        print()
+        printer.print_entries(entries)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.core import data, amount
 from beancount.core.number import D
 import csv
@@ -10,19 +9,26 @@ from china_bean_importers.importer import CsvImporter
 class Importer(CsvImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.config_sections.append(("importers", "thu_ecard"))
         self.match_keywords = ["mername"]
         self.file_account_name = "thu_ecard"
         self.all_ids = set()
 
     def parse_metadata(self, file):
-        if len(self.content) > 2:
-            if m := common_date_pattern.search(self.content[1]):
-                self.end = parse(m[1])
-            if m := common_date_pattern.search(self.content[-1]):
-                self.start = parse(m[1])
-
-    def extract(self, file, existing_entries=None):
-        entries = []
+        if self.line_count > 2:
+            if m := common_date_pattern.search(self.head[1]):
+                self.end = parse_datetime(m[1])
+            if m := common_date_pattern.search(self.tail[-1]):
+                self.start = parse_datetime(m[1])
+
+    def dedup_key(self, entry):
+        if posjourno := entry.meta.get("posjourno"):
+            return ("thu_ecard", posjourno)
+        return None
+
+    def iter_extract(self, file, existing_entries=None):
+        # pos_journo seen in this file
+        self.all_ids = set()
 
         def to_yuan(fen) -> str:
             from decimal import Decimal
@@ -30,7 +36,7 @@ class Importer(CsvImporter):
             d = (Decimal(fen) / 100).quantize(Decimal(".01"))
             return d
 
-        for lineno, row in enumerate(csv.reader(self.content)):
+        for lineno, row in enumerate(self.csv_rows(file.name)):
             row = [col.strip() for col in row]
 
             #    0         1         2        3          4          5       6       7
@@ -43,7 +49,7 @@ class Importer(CsvImporter):
             # skip table header and footer
             if lineno == 0:
                 continue
-            elif lineno == len(self.content) - 1:
+            elif lineno == self.line_count - 1:
                 break
 
             # detect duplicate items by pos_journo
@@ -60,7 +66,7 @@ class Importer(CsvImporter):
 
             # parse some basic info
             summary = row[0]
-            time = parse(row[10])
+            time = parse_datetime(row[10])
             units = amount.Amount(D(to_yuan(row[20])), "CNY")
             balance = amount.Amount(D(to_yuan(row[15])), "CNY")
             payee = row[23]
@@ -73,12 +79,14 @@ class Importer(CsvImporter):
             metadata["location"] = addr
             metadata["time"] = time.time().isoformat()
             metadata["payment_method"] = "清华大学校园卡"
+            if pos_journo != "":
+                metadata["posjourno"] = pos_journo
 
             expense = None
 
-            if any(["消费", "补卡"], lambda k: k in summary):
+            if any(k in summary for k in ["消费", "补卡"]):
                 expense = True
-            elif any(["充值", "代发", "圈存"], lambda k: k in summary):
+            elif any(k in summary for k in ["充值", "代发", "圈存"]):
                 expense = False
 
             my_assert(expense is not None, f"Unknown transaction type", lineno, row)
@@ -89,8 +97,8 @@ class Importer(CsvImporter):
             source_config = self.config["importers"]["thu_ecard"]
             account1 = source_config["account"]
             account2 = unknown_account(self.config, expense)
-            new_account, new_meta, new_tags = match_destination_and_metadata(
-                self.config, summary, payee
+            new_account, new_meta, new_tags = compiled_mappings(self.config).match(
+                summary, payee
             )
             if new_account:
                 account2 = new_account
@@ -125,6 +133,4 @@ class Importer(CsvImporter):
                     ),
                 ],
             )
-            entries.append(txn)
-
-        return entries
+            yield txn
@@ -1,4 +1,3 @@
-from dateutil.parser import parse
 from beancount.core import data, amount
 from beancount.core.number import D
 import csv
@@ -11,20 +10,19 @@ from china_bean_importers.importer import CsvImporter
 class Importer(CsvImporter):
     def __init__(self, config) -> None:
         super().__init__(config)
+        self.config_sections.append(("importers", "thu_ecard"))
         self.match_keywords = ["终端编号"]
         self.file_account_name = "thu_ecard_old"
 
     def parse_metadata(self, file):
-        if len(self.content) > 2:
-            if m := re.search(r"([0-9]{4}-[0-9]{2}-[0-9]{2})", self.content[1]):
-                self.start = parse(m[1])
-            if m := re.search(r"([0-9]{4}-[0-9]{2}-[0-9]{2})", self.content[-2]):
-                self.end = parse(m[1])
-
-    def extract(self, file, existing_entries=None):
-        entries = []
-
-        for lineno, row in enumerate(csv.reader(self.content)):
+        if self.line_count > 2:
+            if m := re.search(r"([0-9]{4}-[0-9]{2}-[0-9]{2})", self.head[1]):
+                self.start = parse_datetime(m[1])
+            if m := re.search(r"([0-9]{4}-[0-9]{2}-[0-9]{2})", self.tail[-2]):
+                self.end = parse_datetime(m[1])
+
+    def iter_extract(self, file, existing_entries=None):
+        for lineno, row in enumerate(self.csv_rows(file.name)):
             row = [col.strip() for col in row]
 
             #  0      1        2        3       4        5
@@ -33,7 +31,7 @@ class Importer(CsvImporter):
             # skip table header and footer
             if lineno == 0:
                 continue
-            elif lineno == len(self.content) - 1:
+            elif lineno == self.line_count - 1:
                 break
 
             # parse data line
@@ -41,7 +39,7 @@ class Importer(CsvImporter):
             tags = set()
 
             # parse some basic info
-            time = parse(row[4])
+            time = parse_datetime(row[4])
             units = amount.Amount(D(row[5]), "CNY")
             _, payee, type, terminal = row[:4]
             metadata["terminal"] = terminal
@@ -63,8 +61,8 @@ class Importer(CsvImporter):
             source_config = self.config["importers"]["thu_ecard"]
             account1 = source_config["account"]
             account2 = unknown_account(self.config, expense)
-            new_account, new_meta, new_tags = match_destination_and_metadata(
-                self.config, type, payee
+            new_account, new_meta, new_tags = compiled_mappings(self.config).match(
+                type, payee
             )
             if new_account:
                 account2 = new_account
@@ -101,6 +99,4 @@ class Importer(CsvImporter):
                     ),
                 ],
             )
-            entries.append(txn)
-
-        return entries
+            yield txn
@@ -57,6 +57,7 @@ config = {
         },
     },
     "pdf_passwords": ["123456"],
+    "pdf_workers": 1, # processes used to read long PDF statements page by page
     # account matching
     "unknown_expense_account": "Expenses:Unknown",
     "unknown_income_account": "Income:Unknown",
@@ -0,0 +1,112 @@
+import datetime
+
+import pytest
+
+pytest.importorskip("beangulp")
+
+from beancount.core import data
+from beancount.core.data import D
+
+from china_bean_importers.beangulp import (
+    ccb_debit_card,
+    hsbc_hk,
+    thu_ecard_old,
+    wechat,
+)
+from china_bean_importers.dedup import DUPLICATE_META, pair_payments
+
+CONFIG = {
+    "card_accounts": {},
+    "detail_mappings": [],
+    "importers": {},
+    "unknown_expense_account": "Expenses:Unknown",
+    "unknown_income_account": "Income:Unknown",
+}
+
+
+def txn(day, number, account, **meta):
+    return data.Transaction(
+        data.new_metadata("ledger.beancount", 0, meta),
+        datetime.date(2024, 1, day),
+        "*",
+        None,
+        "test",
+        data.EMPTY_SET,
+        data.EMPTY_SET,
+        [
+            data.Posting(
+                account, data.Amount(D(number), "CNY"), None, None, None, None
+            ),
+            data.Posting(
+                "Expenses:Food", data.Amount(-D(number), "CNY"), None, None, None, None
+            ),
+        ],
+    )
+
+
+def deduplicate(importer, entries, existing) -> int:
+    # as beangulp's extract command does for every file, in order
+    importer.deduplicate(entries, existing)
+    existing.extend(entries)
+    return sum(DUPLICATE_META in e.meta for e in entries)
+
+
+def test_amount_index_after_unkeyed_importer():
+    # not sorted by date, so that beangulp's similarity comparison, which
+    # sorts existing in place, moves the ledger posting after the others
+    existing = [
+        txn(28, "-9.99", "Assets:CCB"),
+        txn(1, "-1.00", "Assets:Other"),
+        txn(2, "-1.00", "Assets:Other"),
+        txn(3, "-1.00", "Assets:Other"),
+    ]
+    ccb = ccb_debit_card.Importer(CONFIG)
+    assert deduplicate(ccb, [txn(4, "-5.00", "Assets:CCB")], existing) == 0
+    unkeyed = thu_ecard_old.Importer(CONFIG)
+    assert deduplicate(unkeyed, [txn(6, "-3.00", "Assets:Card")], existing) == 0
+
+    # one ledger posting is consumed at most once
+    rows = [txn(28, "-9.99", "Assets:CCB"), txn(28, "-9.99", "Assets:CCB")]
+    assert deduplicate(ccb, rows, existing) == 1
+
+
+def test_key_index_after_unkeyed_importer():
+    existing = [txn(28, "-1.00", "Assets:Other")]
+    wx = wechat.Importer(CONFIG)
+    first = [txn(1 + i, "-2.00", "Assets:WeChat", serial=f"S{i}") for i in range(3)]
+    assert deduplicate(wx, first, existing) == 0
+    unkeyed = thu_ecard_old.Importer(CONFIG)
+    assert deduplicate(unkeyed, [txn(5, "-3.00", "Assets:Card")], existing) == 0
+
+    # serials of the first file, appended to existing before the sort
+    again = [txn(1 + i, "-2.00", "Assets:WeChat", serial=f"S{i}") for i in range(3)]
+    assert deduplicate(wx, again, existing) == 3
+
+
+def test_same_key_matched_once():
+    # two identical purchases on the same day, only one already in the ledger
+    mapping = {"One": "Assets:HSBC"}
+    config = dict(CONFIG, importers={"hsbc_hk": {"account_mapping": mapping}})
+    existing = [txn(3, "-20.00", "Assets:HSBC")]
+    hsbc = hsbc_hk.Importer(config)
+    rows = [txn(3, "-20.00", "Assets:HSBC"), txn(3, "-20.00", "Assets:HSBC")]
+    assert deduplicate(hsbc, rows, existing) == 1
+
+
+def test_same_amount_on_another_card():
+    # the same amount spent on the same expense account with another card
+    existing = [txn(3, "-30.00", "Assets:Card:A")]
+    ccb = ccb_debit_card.Importer(CONFIG)
+    assert deduplicate(ccb, [txn(3, "-30.00", "Assets:Card:B")], existing) == 0
+    assert deduplicate(ccb, [txn(3, "-30.00", "Assets:Card:A")], existing) == 1
+
+
+def test_balance_paid_wallet_entry_not_paired():
+    bank = [txn(3, "-25.00", "Assets:Card:B")]
+    balance = [txn(3, "-25.00", "Assets:WeChat", payment_method="微信支付")]
+    paired, _ = pair_payments([bank, balance])
+    assert DUPLICATE_META not in paired[0].meta
+
+    by_card = [txn(3, "-25.00", "Assets:Card:B", payment_method="微信支付")]
+    paired, _ = pair_payments([bank, by_card])
+    assert paired[0].meta[DUPLICATE_META]
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("beancount.ingest")
+
+from beancount.ingest import cache, extract
+
+from china_bean_importers.dedup import DUPLICATE_META
+from china_bean_importers.thu_ecard import Importer
+
+CONFIG = {
+    "card_accounts": {},
+    "detail_mappings": [],
+    "importers": {"thu_ecard": {"account": "Assets:Card:THU"}},
+    "unknown_expense_account": "Expenses:Unknown",
+    "unknown_income_account": "Income:Unknown",
+}
+HEADER = (
+    "summary,posjourno,idserial,txaccno,inputuserid,pcode,poscode,accno,"
+    "txcode,cardno,txdate,txname,stationcode,identityno,sts,balance,journo,"
+    "regdate,departid,id,txamt,meraddr,username,mername"
+)
+
+
+def write_ecard(path, days) -> str:
+    # one purchase per day, newest first, with a trailing line as exported
+    lines = [HEADER]
+    for day in reversed(days):
+        time = f"2024-01-{day:02d} 12:00:00"
+        row = ["消费", f"P{day}", "", "", "", "", "", "", "", "", time, "消费"]
+        row += ["", "", "1", "10000", "", time, "", "", "1200", "", "", "食堂"]
+        lines.append(",".join(row))
+    lines.append(",".join([""] * 24))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def import_file(importer, name) -> list:
+    # as `bean-extract` does for every file it identifies
+    assert importer.identify(cache.get_file(name))
+    return extract.extract_from_file(name, importer, existing_entries=[])
+
+
+def test_overlapping_files(tmp_path):
+    first = write_ecard(tmp_path / "first.csv", range(1, 11))
+    second = write_ecard(tmp_path / "second.csv", range(6, 16))
+    importer = Importer(CONFIG)
+    entries = import_file(importer, first)
+    assert len(entries) == 10 and not any(DUPLICATE_META in e.meta for e in entries)
+
+    entries = import_file(importer, second)
+    marked = [e.meta["posjourno"] for e in entries if DUPLICATE_META in e.meta]
+    assert len(entries) == 10 and marked == [f"P{day}" for day in range(6, 11)]
+
+    # extracting a file again does not compare it with itself
+    entries = import_file(importer, first)
+    assert not any(DUPLICATE_META in e.meta for e in entries[:5])
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("beangulp")
+
+from china_bean_importers.beangulp import thu_ecard_old
+
+CONFIG = {
+    "card_accounts": {},
+    "detail_mappings": [],
+    "importers": {"thu_ecard": {"account": "Assets:Card:THU"}},
+    "unknown_expense_account": "Expenses:Unknown",
+    "unknown_income_account": "Income:Unknown",
+}
+
+
+def write_ecard(path, terminal, days) -> str:
+    lines = ["序号,交易地点,交易类型,终端编号,交易时间,交易金额"]
+    for i, day in enumerate(days):
+        time = f"2024-01-{day:02d} 12:00:00"
+        lines.append(f"{i + 1},食堂,消费,{terminal},{time},9.50")
+    lines.append("合计,,,,,")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_stream_after_identifying_another_file(tmp_path):
+    first = write_ecard(tmp_path / "first.csv", "T1", [1, 2, 3])
+    second = write_ecard(tmp_path / "second.csv", "T2", [4, 5])
+    importer = thu_ecard_old.Importer(CONFIG)
+    assert importer.identify(first) and importer.identify(second)
+
+    entries = list(importer.iter_extract(first))
+    assert [e.meta["terminal"] for e in entries] == ["T1"] * 3
+    assert {e.meta["filename"] for e in entries} == {first}
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from china_bean_importers.common import (
+    SAME_AS_NARRATION,
+    BillDetailMapping,
+    CompiledMappings,
+    compiled_mappings,
+)
+
+ACCOUNTS = [
+    None,
+    "Expenses:Food",
+    "Expenses:Food:Lunch",
+    "Expenses:Food:Dinner",
+    "Expenses:Travel",
+]
+ALPHABET = "abc甲乙"
+
+
+def linear_resolve(mappings, desc, payee):
+    # the scan over every BillDetailMapping that CompiledMappings replaces
+    account = None
+    mapping = None
+    priority = 0
+    metadata = {}
+    tags = set()
+    conflicts = 0
+    for m in mappings:
+        new_account, new_metadata, new_tags, new_priority = m.match(desc, payee)
+        if account is None or new_priority > priority:
+            account, mapping, priority = new_account, m, new_priority
+        elif new_account is not None and new_priority == priority:
+            if new_account.startswith(account):
+                account, mapping = new_account, m
+            elif not account.startswith(new_account):
+                conflicts += 1
+        metadata.update(new_metadata)
+        tags.update(new_tags)
+    return account, metadata, tags, conflicts
+
+
+def random_text(rng, size):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(size)))
+
+
+def random_keywords(rng):
+    if rng.random() < 0.2:
+        return None
+    return [random_text(rng, 3) or "a" for _ in range(rng.randrange(1, 4))]
+
+
+def random_mapping(rng, i) -> BillDetailMapping:
+    narration_keywords = random_keywords(rng)
+    payee_keywords = random_keywords(rng)
+    if narration_keywords is not None and rng.random() < 0.15:
+        payee_keywords = SAME_AS_NARRATION
+    return BillDetailMapping(
+        narration_keywords=narration_keywords,
+        payee_keywords=payee_keywords,
+        destination_account=rng.choice(ACCOUNTS),
+        additional_tags=rng.choice([None, [f"t{i}"], ["shared"]]),
+        additional_metadata=rng.choice([None, {"k": i}, {f"m{i}": "v"}]),
+        priority=rng.choice([-1, 0, 0, 1, 2]),
+        match_logic=rng.choice(["OR", "OR", "AND"]),
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_same_result_as_linear_scan(seed):
+    rng = random.Random(seed)
+    mappings = [random_mapping(rng, i) for i in range(rng.randrange(1, 40))]
+    compiled = CompiledMappings(mappings, cache_size=0)
+    for _ in range(200):
+        desc = None if rng.random() < 0.1 else random_text(rng, 8)
+        payee = None if rng.random() < 0.1 else random_text(rng, 8)
+        account, metadata, tags, warnings = compiled.resolve(desc, payee)
+        expected = linear_resolve(mappings, desc, payee)
+        assert (account, metadata, set(tags), len(warnings)) == expected
+
+
+def test_rule_replaced_mid_list():
+    rule = BillDetailMapping(
+        narration_keywords=["coffee"], destination_account="Expenses:Food"
+    )
+    config = {"detail_mappings": [rule, rule, rule]}
+    assert compiled_mappings(config, check=True).match("coffee", None)[0] == (
+        "Expenses:Food"
+    )
+    config["detail_mappings"][1] = rule._replace(
+        destination_account="Expenses:Food:Coffee"
+    )
+    assert compiled_mappings(config).match("coffee", None)[0] == "Expenses:Food"
+    # as done once before each extract
+    assert compiled_mappings(config, check=True).match("coffee", None)[0] == (
+        "Expenses:Food:Coffee"
+    )